@@ -1,5 +1,12 @@
+import asyncio
+from time import time
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event
+
+from api.auth.security import password_hasher
+from api.utils.cache import ExpiringCache
 
 
 @pytest.mark.asyncio
@@ -65,3 +72,81 @@ async def test_me_endpoint_requires_token(async_client: AsyncClient):
     data = response.json()
     assert data["email"] == "me@test.com"
     assert "id" in data
+
+
+@pytest.mark.asyncio
+async def test_me_endpoint_caches_user(async_client: AsyncClient, graphql_query_fixture, auth_token, engine):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await async_client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+
+    statements = []
+
+    def count(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = await async_client.get("/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert statements == []
+
+        # changing the user drops the cached copy
+        mutation = "mutation { updateUser(userName: \"renamed\") { userName } }"
+        assert "errors" not in (await graphql_query_fixture(mutation, None, headers)).json()
+        response = await async_client.get("/auth/me", headers=headers)
+        assert response.json()["user_name"] == "renamed"
+
+        mutation = "mutation { deleteUser }"
+        assert (await graphql_query_fixture(mutation, None, headers)).json()["data"]["deleteUser"] is True
+        response = await async_client.get("/auth/me", headers=headers)
+        assert response.status_code == 401
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_leaves_event_loop_free():
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    hashed = await password_hasher.hash("securepassword123")
+    ticker.cancel()
+
+    # bcrypt takes far longer than a millisecond, so a blocked loop would manage at most one tick
+    assert ticks > 1
+    assert await password_hasher.verify("securepassword123", hashed)
+
+
+@pytest.mark.asyncio
+async def test_register_rejected_when_hashing_is_saturated(async_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = await async_client.post("/auth/register", json={
+        "email": "busy@example.com",
+        "password": "securepassword123"
+    })
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert (await async_client.get("/health")).json()["password_hashing"]["rejected"] >= 1
+
+
+def test_expiring_cache_evicts_expired_and_least_recent():
+    cache: ExpiringCache[int] = ExpiringCache(max_size=2)
+    cache.set("a", 1, time() + 60)
+    cache.set("b", 2, time() + 60)
+    assert cache.get("a") == 1
+
+    # "b" is now least recently used
+    cache.set("c", 3, time() + 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("d", 4, time() - 1)
+    assert cache.get("d") is None
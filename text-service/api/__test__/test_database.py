@@ -0,0 +1,80 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.pool import NullPool
+
+from api.factories.database import engine_options
+from api.maintenance import maintain_partitions
+from api.models.user_stats_session_model import UserStatsSession
+from api.services.session_partitions import add_months, list_session_partitions, maintain_session_partitions, \
+    month_start
+from api.settings import settings
+
+
+def test_engine_options_pool_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", None)
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+
+    options = engine_options()
+    assert options["pool_size"] == settings.DB_POOL_SIZE
+    assert options["pool_pre_ping"] == settings.DB_POOL_PRE_PING
+
+
+def test_engine_options_no_pool_on_lambda(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", None)
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "typation-api")
+
+    assert engine_options() == {"poolclass": NullPool}
+
+
+def test_engine_options_pgbouncer(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "pgbouncer")
+
+    options = engine_options()
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_session_partitions_created_and_archived(session, users, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_PARTITION_MONTHS_AHEAD", 1)
+    monkeypatch.setattr(settings, "SESSION_ARCHIVE_AFTER_MONTHS", 1)
+    monkeypatch.setattr(settings, "SESSION_ARCHIVE_SCHEMA", "test_archive")
+
+    # before any monthly partition exists, sessions land in the default partition
+    stats_session = UserStatsSession(user_id=users[0].id, wpm=50, start_time=datetime(2021, 3, 10, tzinfo=timezone.utc))
+    session.add(stats_session)
+    await session.commit()
+
+    assert await maintain_session_partitions(session, today=date(2021, 3, 20))
+    await session.commit()
+    assert set((await list_session_partitions(session)).values()) == {
+        "user_stats_sessions_2021_03", "user_stats_sessions_2021_04"
+    }
+    # moved out of the default partition, and still found by id
+    partition = await session.scalar(text("SELECT tableoid::regclass::text FROM user_stats_sessions"))
+    assert partition == "user_stats_sessions_2021_03"
+    session.expunge_all()
+    assert (await session.get(UserStatsSession, stats_session.id)).wpm == 50
+
+    try:
+        await maintain_session_partitions(session, today=date(2021, 5, 1))
+        await session.commit()
+
+        assert "user_stats_sessions_2021_03" not in (await list_session_partitions(session)).values()
+        assert await session.scalar(select(func.count()).select_from(UserStatsSession)) == 0
+        assert await session.scalar(text("SELECT count(*) FROM test_archive.user_stats_sessions_2021_03")) == 1
+    finally:
+        await session.rollback()
+        await session.execute(text("DROP SCHEMA IF EXISTS test_archive CASCADE"))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_scheduled_maintenance_creates_coming_partitions(session, session_maker, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_PARTITION_MONTHS_AHEAD", 2)
+
+    assert await maintain_partitions(session_maker)
+    current = month_start(datetime.now(timezone.utc).date())
+    assert set(await list_session_partitions(session)) == {current, add_months(current, 1), add_months(current, 2)}
@@ -0,0 +1,326 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+
+from api.services.corpus_service import ALL_DIGRAPHS, ALL_UNIGRAPHS, FEATURE_COUNT, Corpus, corpus_registry, \
+    load_corpus
+from api.services import practice_streams as practice_streams_module
+from api.services.practice_streams import PracticeStreams
+from api.services.practice_text_service import pick_passages, stream_words
+from api.settings import settings
+
+
+async def create_summary_weak_on(graphql_query_fixture, headers, weak_key: str):
+    mutation = """
+        mutation CreateUserStatsSummary($userStatsSummary: UserStatsSummaryCreateInput!) {
+            createUserStatsSummary(inputData: $userStatsSummary) {
+                userId
+            }
+        }
+    """
+    variables = {
+        "userStatsSummary": {
+            "correctedCharCount": 0,
+            "deletedCharCount": 0,
+            "totalKeystrokes": 0,
+            "totalCharCount": 0,
+            "errorCharCount": 0,
+            "unigraphs": [
+                {"key": key, "count": 1000, "accuracy": 0 if key == weak_key else 100}
+                for key in ALL_UNIGRAPHS
+            ],
+            "digraphs": [
+                {"key": key, "count": 1000, "accuracy": 100, "meanInterval": 100}
+                for key in ALL_DIGRAPHS
+            ],
+        }
+    }
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+
+@pytest.mark.asyncio
+async def test_practice_text_new_user(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post("/text/generate-practice-text", json={"minlen": 4, "maxlen": 6}, headers=headers)
+    assert response.status_code == 200
+
+    words = response.json()["text"].split(" ")
+    assert len(words) == settings.WORD_LIMIT
+    assert all(4 <= len(word) <= 6 for word in words)
+
+
+@pytest.mark.asyncio
+async def test_practice_text_small_window(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post("/text/generate-practice-text", json={"minlen": 15, "maxlen": 20}, headers=headers)
+    assert response.status_code == 200
+
+    words = response.json()["text"].split(" ")
+    assert 0 < len(words) < settings.WORD_LIMIT
+    assert all(len(word) >= 15 for word in words)
+
+
+@pytest.mark.asyncio
+async def test_practice_text_targets_weak_keys(client, graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    await create_summary_weak_on(graphql_query_fixture, headers, "q")
+
+    response = await client.post("/text/generate-practice-text", json={}, headers=headers)
+    assert response.status_code == 200
+
+    words = response.json()["text"].split(" ")
+    assert len(words) == settings.WORD_LIMIT
+    # the corpus has fewer q-words than WORD_LIMIT, so every one of them should be picked
+    assert sum("q" in word for word in words) == sum("q" in word for word in load_corpus().words)
+
+
+@pytest.mark.asyncio
+async def test_practice_text_follows_new_session(client, graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    await create_summary_weak_on(graphql_query_fixture, headers, "q")
+
+    # warm the difficulty cache with the q-heavy stats
+    response = await client.post("/text/generate-practice-text", json={}, headers=headers)
+    assert response.status_code == 200
+
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) {
+                id
+            }
+        }
+    """
+    variables = {
+        "userStatsSessionInput": {
+            "wpm": 60,
+            "accuracy": 90,
+            "practiceDuration": 60000,
+            "unigraphs": [
+                {"key": "q", "count": 100000, "accuracy": 100, "mistyped": []},
+                {"key": "z", "count": 100000, "accuracy": 0, "mistyped": []},
+            ],
+        }
+    }
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    response = await client.post("/text/generate-practice-text", json={}, headers=headers)
+    words = response.json()["text"].split(" ")
+    assert sum("z" in word for word in words) == sum("z" in word for word in load_corpus().words)
+
+
+@pytest.mark.asyncio
+async def test_practice_text_builtin_corpus(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post("/text/generate-practice-text", json={"corpus": "punctuation"}, headers=headers)
+    assert response.status_code == 200
+    assert all(not word.isalpha() for word in response.json()["text"].split(" "))
+
+    response = await client.post("/text/generate-practice-text", json={"corpus": "missing"}, headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_practice_text_uploaded_corpus(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post(
+        "/text/corpora",
+        json={"name": "mine", "words": ["alpha", "beta", " gamma ", ""]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["words"] == 3
+
+    response = await client.post("/text/generate-practice-text", json={"corpus": "mine"}, headers=headers)
+    assert sorted(response.json()["text"].split(" ")) == ["alpha", "beta", "gamma"]
+
+    response = await client.post("/text/corpora", json={"name": "english", "words": ["x"]}, headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_uploaded_corpus_survives_eviction(client, auth_token, monkeypatch):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    monkeypatch.setattr(settings, "MAX_UPLOADED_CORPORA", 1)
+    response = await client.post("/text/corpora", json={"name": "mine", "words": ["alpha", "beta"]}, headers=headers)
+    assert response.status_code == 200
+
+    # as if evicted, or uploaded to another process
+    monkeypatch.setattr(corpus_registry, "_loaded", OrderedDict())
+    response = await client.post("/text/generate-practice-text", json={"corpus": "mine"}, headers=headers)
+    assert response.status_code == 200
+    assert sorted(response.json()["text"].split(" ")) == ["alpha", "beta"]
+
+    # replacing a list doesn't count against the cap, adding another does
+    response = await client.post("/text/corpora", json={"name": "mine", "words": ["gamma"]}, headers=headers)
+    assert response.status_code == 200
+    response = await client.post("/text/corpora", json={"name": "other", "words": ["delta"]}, headers=headers)
+    assert response.status_code == 400
+
+
+PACKAGED_CORPORA = """
+import mmap
+from api.services.corpus_service import CORPUS_SOURCES, load_corpus_file
+
+print(all(isinstance(load_corpus_file(source).word_blob.base.obj, mmap.mmap) for source in CORPUS_SOURCES.values()))
+"""
+
+
+@pytest.mark.skipif(shutil.which("make") is None, reason="needs make")
+def test_packaged_corpora_are_mapped(tmp_path):
+    # the same steps sam build runs for the function, minus installing requirements
+    service_root = Path(__file__).resolve().parents[2]
+    subprocess.run(
+        ["make", "build-corpus", f"ARTIFACTS_DIR={tmp_path}"],
+        cwd=service_root,
+        capture_output=True,
+        check=True,
+    )
+    assert (tmp_path / "text.bin").exists()
+
+    result = subprocess.run(
+        [sys.executable, "-c", PACKAGED_CORPORA],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(tmp_path), "DATABASE_URL": "", "SECRET_KEY": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "True"
+
+
+def test_compiled_corpus_round_trip(tmp_path):
+    corpus = Corpus.from_words(["zebra", "a", "quick", "naïve", "ox"])
+    corpus.save(tmp_path / "words.bin")
+    mapped = Corpus.from_file(tmp_path / "words.bin")
+
+    assert list(mapped.words) == ["a", "ox", "zebra", "quick", "naïve"]
+    assert mapped.window(2, 5) == corpus.window(2, 5) == range(1, 5)
+
+    difficulty = np.linspace(0.0, 2.0, FEATURE_COUNT)
+    assert np.array_equal(mapped.score(difficulty), corpus.score(difficulty))
+
+
+@pytest.mark.asyncio
+async def test_practice_text_batch(client, graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    await create_summary_weak_on(graphql_query_fixture, headers, "q")
+
+    response = await client.post("/text/generate-practice-text/batch", json={"count": 3}, headers=headers)
+    assert response.status_code == 200
+
+    passages = [text.split(" ") for text in response.json()["texts"]]
+    assert [len(words) for words in passages] == [settings.WORD_LIMIT] * 3
+    # one pool sampled without replacement, so no word repeats across passages
+    assert len({word for words in passages for word in words}) == 3 * settings.WORD_LIMIT
+
+    response = await client.post(
+        "/text/generate-practice-text/batch",
+        json={"count": settings.MAX_PRACTICE_PASSAGES + 1},
+        headers=headers,
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_practice_text_stream(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post(
+        "/text/stream-practice-text",
+        json={"minlen": 4, "maxlen": 6, "chunk_size": 20, "words": 50},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert "stream_id" in events[0]
+    chunks = [event["text"].split(" ") for event in events[1:]]
+    assert [len(words) for words in chunks] == [20, 20, 10]
+    assert all(4 <= len(word) <= 6 for words in chunks for word in words)
+
+    response = await client.post(
+        f"/text/stream-practice-text/{events[0]['stream_id']}/accuracy",
+        json={"accuracy": {"q": 0}},
+        headers=headers,
+    )
+    # the stream closed once its words were sent
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_practice_text_stream_ends_by_default(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post("/text/stream-practice-text", json={"chunk_size": 50}, headers=headers)
+    assert response.status_code == 200
+
+    chunks = [json.loads(line)["text"].split(" ") for line in response.text.splitlines()[1:]]
+    assert sum(len(words) for words in chunks) == settings.WORD_LIMIT
+
+    response = await client.post(
+        "/text/stream-practice-text", json={"words": settings.MAX_STREAM_WORDS + 1}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_stream_accuracy_reaches_another_process(client, auth_token, users, monkeypatch):
+    redis = FakeAsyncRedis(server=FakeServer())
+    monkeypatch.setattr(practice_streams_module, "get_redis", lambda: redis)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    # the stream is open in some other process, sharing nothing with this one but Redis
+    elsewhere = PracticeStreams(settings.PRACTICE_STREAM_TTL)
+    stream_id = uuid4()
+    await elsewhere.open(stream_id, users[0].id)
+
+    response = await client.post(
+        f"/text/stream-practice-text/{stream_id}/accuracy", json={"accuracy": {"q": 0, "z": 50}}, headers=headers
+    )
+    assert response.status_code == 204
+    assert await elsewhere.take(stream_id) == {"q": 0.0, "z": 50.0}
+    assert await elsewhere.take(stream_id) == {}
+
+    # someone else's stream
+    await elsewhere.open(stream_id, users[1].id)
+    response = await client.post(
+        f"/text/stream-practice-text/{stream_id}/accuracy", json={"accuracy": {"q": 0}}, headers=headers
+    )
+    assert response.status_code == 404
+
+    await elsewhere.close(stream_id)
+    assert await redis.keys() == []
+    await redis.aclose()
+
+
+def test_pick_passages_breaks_ties_at_random():
+    corpus = Corpus.from_words([f"{a}{b}" for a in "abcdefgh" for b in "ijklmnop"])
+    # every word scores the same, so which 4 of the 64 are picked is down to tie-breaking
+    difficulty = np.zeros(FEATURE_COUNT, dtype=np.float64)
+
+    picks = {
+        frozenset(pick_passages(corpus, corpus.window(1, 20), difficulty, 1, 4)[0])
+        for _ in range(10)
+    }
+    assert len(picks) > 1
+
+
+def test_stream_words_reweights():
+    corpus = Corpus.from_words(["jazz", "quiz", "maze", "cool", "door", "moon"])
+    chunks = stream_words(corpus, corpus.window(1, 20), None, 2)
+
+    served = next(chunks) + next(chunks) + next(chunks)
+    assert sorted(served) == sorted(corpus.words)
+
+    chunk = chunks.send({"z": 0})
+    assert all("z" in word for word in chunk)
@@ -1,4 +1,15 @@
+import asyncio
+from datetime import datetime, timezone
+
 import pytest
+from sqlalchemy import select
+
+from api.controllers.user_stats_session_controller import apply_sessions_to_summaries
+from api.models.unigraph_model import Unigraph
+from api.models.user_stats_session_model import UserStatsSession
+from api.models.user_stats_summary_model import UserStatsSummary
+from api.schemas.user_stats_session_schema import UserStatsSessionCreate
+from api.settings import settings
 
 
 @pytest.mark.asyncio
@@ -41,15 +52,41 @@ async def test_create_stats_session(graphql_query_fixture, auth_token):
 
 
 @pytest.mark.asyncio
-async def test_get_all_stats_sessions(graphql_query_fixture, auth_token):
+async def test_get_all_stats_sessions(graphql_query_fixture, auth_token, users, session, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_SESSION_PAGE_SIZE", 2)
+    session.add_all(
+        [
+            UserStatsSession(user_id=users[0].id, wpm=wpm, start_time=datetime(2024, 1, day, tzinfo=timezone.utc))
+            for day, wpm in [(1, 40), (2, 50), (3, 60)]
+        ]
+        + [UserStatsSession(user_id=users[1].id, wpm=99)]
+    )
+    await session.commit()
+
+    query = """query { userStatsSessions { userId wpm } }"""
+    response = await graphql_query_fixture(query, None, None)
+    assert response.json()["data"]["userStatsSessions"] == []
+
     headers = {"Authorization": f"Bearer {auth_token}"}
-    # Assumes session(s) created in fixture or earlier test
-    query = """query { userStatsSessions { id wpm accuracy } }"""
     response = await graphql_query_fixture(query, None, headers)
     assert response.status_code == 200
     json_data = response.json()
     assert "errors" not in json_data
-    assert isinstance(json_data["data"]["userStatsSessions"], list)
+    # only the caller's, newest first, capped at the page size
+    assert json_data["data"]["userStatsSessions"] == [
+        {"userId": str(users[0].id), "wpm": 60},
+        {"userId": str(users[0].id), "wpm": 50},
+    ]
+
+    # the nested field is capped the same way
+    query = """query { user { sessions(first: 10) { wpm startTime } } }"""
+    response = await graphql_query_fixture(query, None, headers)
+    json_data = response.json()
+    assert "errors" not in json_data
+    assert json_data["data"]["user"]["sessions"] == [
+        {"wpm": 60, "startTime": datetime(2024, 1, 3, tzinfo=timezone.utc).timestamp()},
+        {"wpm": 50, "startTime": datetime(2024, 1, 2, tzinfo=timezone.utc).timestamp()},
+    ]
 
 
 @pytest.mark.asyncio
@@ -203,3 +240,295 @@ async def test_get_stats_session_by_id(graphql_query_fixture, auth_token):
 #     check = await graphql_query_fixture(query, {"sessionId": session_id}, headers)
 #     assert check.status_code == 200
 #     assert check.json()["data"]["userStatsSession"] is None
+
+
+@pytest.mark.asyncio
+async def test_create_stats_session_upserts_graphs(graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) {
+                id
+            }
+        }
+    """
+    variables = {
+        "userStatsSessionInput": {
+            "wpm": 60,
+            "accuracy": 95,
+            "practiceDuration": 60000,
+            "unigraphs": [
+                {"key": "a", "count": 1, "accuracy": 100, "mistyped": []},
+                {"key": "b", "count": 2, "accuracy": 90, "mistyped": []}
+            ],
+            "digraphs": [
+                {"key": "ab", "count": 1, "accuracy": 95, "meanInterval": 120},
+                {"key": "bc", "count": 2, "accuracy": 100, "meanInterval": 100}
+            ]
+        }
+    }
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    # a second session hits the ON CONFLICT branch for every key
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    query = """
+        query {
+          userStatsSummary {
+            unigraphs { key }
+            digraphs { key meanInterval }
+          }
+        }
+    """
+    response = await graphql_query_fixture(query, None, headers)
+    data = response.json()["data"]["userStatsSummary"]
+    assert sorted(u["key"] for u in data["unigraphs"]) == ["a", "b"]
+    assert sorted((d["key"], d["meanInterval"]) for d in data["digraphs"]) == [("ab", 120), ("bc", 100)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_merge_in_database(graphql_query_fixture, auth_token, session):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    # a summary created without counters leaves them NULL
+    create_summary = """
+        mutation CreateUserStatsSummary($userStatsSummary: UserStatsSummaryCreateInput!) {
+            createUserStatsSummary(inputData: $userStatsSummary) {
+                userId
+            }
+        }
+    """
+    response = await graphql_query_fixture(create_summary, {"userStatsSummary": {"totalSessions": 0}}, headers)
+    assert "errors" not in response.json()
+
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) {
+                id
+            }
+        }
+    """
+
+    def session_input(wpm, count, accuracy, mistyped):
+        return {
+            "userStatsSessionInput": {
+                "wpm": wpm,
+                "accuracy": accuracy,
+                "practiceDuration": 1000,
+                "totalCharsTyped": count,
+                "unigraphs": [{"key": "a", "count": count, "accuracy": accuracy, "mistyped": mistyped}],
+                "digraphs": [{"key": "ab", "count": count, "accuracy": accuracy, "meanInterval": 100 * count}],
+            }
+        }
+
+    responses = await asyncio.gather(
+        graphql_query_fixture(mutation, session_input(40, 1, 100, None), headers),
+        graphql_query_fixture(mutation, session_input(80, 3, 0, [{"key": "s", "count": 3}]), headers),
+        graphql_query_fixture(mutation, session_input(60, 4, 50, [{"key": "s", "count": 1}]), headers),
+    )
+    assert all("errors" not in response.json() for response in responses)
+
+    query = """
+        query {
+          userStatsSummary {
+            totalSessions
+            totalPracticeDuration
+            totalKeystrokes
+            averageWpm
+            fastestWpm
+            unigraphs { key count accuracy }
+            digraphs { key count accuracy meanInterval }
+          }
+        }
+    """
+    response = await graphql_query_fixture(query, None, headers)
+    data = response.json()["data"]["userStatsSummary"]
+    assert data["totalSessions"] == 3
+    assert data["totalPracticeDuration"] == 3000
+    assert data["totalKeystrokes"] == 8
+    assert data["averageWpm"] == 60
+    assert data["fastestWpm"] == 80
+
+    # (1 * 100 + 3 * 0 + 4 * 50) / 8, whatever order the sessions landed in
+    assert data["unigraphs"] == [{"key": "a", "count": 8, "accuracy": pytest.approx(38, abs=1)}]
+    assert data["digraphs"][0]["count"] == 8
+
+    mistyped = await session.scalar(select(Unigraph.mistyped))
+    assert mistyped == {"s": 4}
+
+
+@pytest.mark.asyncio
+async def test_apply_session_batch(users, session):
+    def session_data(wpm, count):
+        return UserStatsSessionCreate(
+            wpm=wpm,
+            practice_duration=1000,
+            unigraphs={"a": {"count": count, "accuracy": 100}},
+            digraphs={"ab": {"count": count, "accuracy": 100, "mean_interval": 100}},
+        )
+
+    # the first user's second session lands in a second round
+    batch = [
+        (users[0].id, session_data(40, 1)),
+        (users[1].id, session_data(50, 2)),
+        (users[0].id, session_data(80, 3)),
+    ]
+    assert await apply_sessions_to_summaries(batch, session) == {users[0].id, users[1].id}
+    await session.commit()
+
+    summaries = {
+        summary.user_id: summary
+        for summary in (await session.scalars(select(UserStatsSummary))).all()
+    }
+    assert summaries[users[0].id].total_sessions == 2
+    assert summaries[users[0].id].average_wpm == 60
+    assert summaries[users[0].id].fastest_wpm == 80
+    assert [u.count for u in summaries[users[0].id].unigraphs] == [4]
+    assert summaries[users[1].id].total_practice_duration == 1000
+    assert [d.count for d in summaries[users[1].id].digraphs] == [2]
+
+
+@pytest.mark.asyncio
+async def test_session_history_pages(graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) {
+                id
+            }
+        }
+    """
+    # two sessions share a start time so the id tie-break is exercised
+    for index, start_time in enumerate([1_700_000_000, 1_700_000_100, 1_700_000_100, 1_700_000_200, 1_700_000_300]):
+        variables = {"userStatsSessionInput": {"wpm": index, "practiceDuration": 1000, "startTime": start_time}}
+        response = await graphql_query_fixture(mutation, variables, headers)
+        assert "errors" not in response.json()
+
+    query = """
+        query History($first: Int!, $after: String) {
+          userStatsSessionHistory(first: $first, after: $after) {
+            edges { cursor node { id startTime } }
+            pageInfo { hasNextPage endCursor }
+          }
+        }
+    """
+    nodes, after, pages = [], None, 0
+    while True:
+        response = await graphql_query_fixture(query, {"first": 2, "after": after}, headers)
+        history = response.json()["data"]["userStatsSessionHistory"]
+        nodes += [edge["node"] for edge in history["edges"]]
+        pages += 1
+        if not history["pageInfo"]["hasNextPage"]:
+            break
+        after = history["pageInfo"]["endCursor"]
+
+    assert pages == 3
+    assert len({node["id"] for node in nodes}) == 5
+    assert [node["startTime"] for node in nodes] == sorted((node["startTime"] for node in nodes), reverse=True)
+
+    response = await graphql_query_fixture(query, {"first": 2, "after": "not-a-cursor"}, headers)
+    assert response.json()["errors"][0]["message"] == "Invalid cursor"
+
+    query = """
+        query Range($startDate: DateTime!, $endDate: DateTime!) {
+          userStatsSessionsByDateRange(startDate: $startDate, endDate: $endDate) { id }
+        }
+    """
+    variables = {"startDate": "2023-11-14T22:13:00+00:00", "endDate": "2099-01-01T00:00:00+00:00"}
+    response = await graphql_query_fixture(query, variables, headers)
+    assert "errors" not in response.json()
+
+
+@pytest.mark.asyncio
+async def test_daily_stats_rollup(graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) {
+                id
+            }
+        }
+    """
+    # 2024-01-01 is a Monday; the last session falls in the following week
+    sessions = [
+        ("2024-01-01T09:00:00+00:00", 40, 90.0),
+        ("2024-01-01T21:00:00+00:00", 60, 100.0),
+        ("2024-01-03T12:00:00+00:00", 50, 80.0),
+        ("2024-01-08T12:00:00+00:00", 70, 95.0),
+    ]
+    for start_time, wpm, accuracy in sessions:
+        variables = {"userStatsSessionInput": {
+            "wpm": wpm,
+            "accuracy": accuracy,
+            "practiceDuration": 1000,
+            "startTime": datetime.fromisoformat(start_time).timestamp(),
+        }}
+        response = await graphql_query_fixture(mutation, variables, headers)
+        assert "errors" not in response.json()
+
+    query = """
+        query Daily($startDate: Date!, $endDate: Date!, $granularity: StatsGranularity!) {
+          userDailyStats(startDate: $startDate, endDate: $endDate, granularity: $granularity) {
+            periodStart sessions practiceDuration averageWpm fastestWpm averageAccuracy
+          }
+        }
+    """
+    variables = {"startDate": "2024-01-01", "endDate": "2024-01-31", "granularity": "DAY"}
+    response = await graphql_query_fixture(query, variables, headers)
+    days = response.json()["data"]["userDailyStats"]
+    assert [(day["periodStart"], day["sessions"]) for day in days] == [
+        ("2024-01-01", 2), ("2024-01-03", 1), ("2024-01-08", 1)
+    ]
+    assert days[0]["averageWpm"] == 50
+    assert days[0]["fastestWpm"] == 60
+    assert days[0]["averageAccuracy"] == 95
+
+    variables["granularity"] = "WEEK"
+    response = await graphql_query_fixture(query, variables, headers)
+    weeks = response.json()["data"]["userDailyStats"]
+    assert [(week["periodStart"], week["sessions"], week["practiceDuration"]) for week in weeks] == [
+        ("2024-01-01", 3, 3000), ("2024-01-08", 1, 1000)
+    ]
+    assert weeks[0]["averageAccuracy"] == 90
+
+    variables["granularity"] = "MONTH"
+    response = await graphql_query_fixture(query, variables, headers)
+    assert [(month["periodStart"], month["sessions"]) for month in response.json()["data"]["userDailyStats"]] == [
+        ("2024-01-01", 4)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_daily_stats_use_user_timezone(graphql_query_fixture, auth_token, session):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation UpdateUser($timezone: String!) {
+            updateUser(timezone: $timezone) { timezone }
+        }
+    """
+    response = await graphql_query_fixture(mutation, {"timezone": "America/New_York"}, headers)
+    assert "errors" not in response.json()
+
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) { id }
+        }
+    """
+    # still Dec 31 in New York
+    start_time = datetime.fromisoformat("2024-01-01T03:00:00+00:00").timestamp()
+    variables = {"userStatsSessionInput": {"wpm": 50, "practiceDuration": 1000, "startTime": start_time}}
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    query = """
+        query Daily($startDate: Date!, $endDate: Date!) {
+          userDailyStats(startDate: $startDate, endDate: $endDate, granularity: DAY) { periodStart sessions }
+        }
+    """
+    response = await graphql_query_fixture(query, {"startDate": "2023-12-01", "endDate": "2024-01-31"}, headers)
+    assert response.json()["data"]["userDailyStats"] == [{"periodStart": "2023-12-31", "sessions": 1}]
+
+    # the same day the streak counted
+    last_practice_date = await session.scalar(select(UserStatsSummary.last_practice_date))
+    assert last_practice_date.isoformat() == "2023-12-31"
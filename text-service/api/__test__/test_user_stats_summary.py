@@ -1,4 +1,10 @@
+from datetime import date, datetime, timezone
+
 import pytest
+from sqlalchemy import event, select, update
+
+from api.models.user_stats_summary_model import UserStatsSummary
+from api.services.streak_backfill import backfill_practice_streaks
 
 
 @pytest.mark.asyncio
@@ -81,3 +87,145 @@ async def test_get_user_stats_summary_by_user_id(graphql_query_fixture, auth_tok
     assert data["totalSessions"] == 5
     assert data["averageWpm"] == 65.0
     assert data["fastestWpm"] == 85
+
+
+@pytest.mark.asyncio
+async def test_summary_ngrams_load_only_when_selected(graphql_query_fixture, auth_token, engine):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation CreateUserStatsSummary($userStatsSummary: UserStatsSummaryCreateInput!) {
+            createUserStatsSummary(inputData: $userStatsSummary) {
+                userId
+            }
+        }
+    """
+    variables = {
+        "userStatsSummary": {
+            "totalSessions": 1,
+            "unigraphs": [{"key": "z", "accuracy": 92, "count": 4, "mistyped": []}],
+            "digraphs": [{"key": "ab", "meanInterval": 222, "accuracy": 88, "count": 11}],
+        }
+    }
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    statements = []
+
+    def record(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        query = "query { userStatsSummary { totalSessions } }"
+        response = await graphql_query_fixture(query, None, headers)
+        assert response.json()["data"]["userStatsSummary"]["totalSessions"] == 1
+        assert not any("FROM unigraphs" in s or "FROM digraphs" in s for s in statements)
+
+        statements.clear()
+        query = """
+            query {
+              userStatsSummary { unigraphs { key } digraphs { key } }
+              user { summary { unigraphs { key } } }
+            }
+        """
+        response = await graphql_query_fixture(query, None, headers)
+        data = response.json()["data"]
+        assert data["userStatsSummary"]["unigraphs"] == [{"key": "z"}]
+        assert data["userStatsSummary"]["digraphs"] == [{"key": "ab"}]
+        assert data["user"]["summary"]["unigraphs"] == [{"key": "z"}]
+        # both summaries and both unigraph lists come from one batched query each
+        assert sum("FROM user_stats_summaries" in s for s in statements) == 1
+        assert sum("FROM unigraphs" in s for s in statements) == 1
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.mark.asyncio
+async def test_unigraph_by_id(graphql_query_fixture, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation CreateUserStatsSummary($userStatsSummary: UserStatsSummaryCreateInput!) {
+            createUserStatsSummary(inputData: $userStatsSummary) {
+                userId
+            }
+        }
+    """
+    variables = {
+        "userStatsSummary": {
+            "totalSessions": 1,
+            "unigraphs": [{"key": "q", "accuracy": 75, "count": 8, "mistyped": []}],
+        }
+    }
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    response = await graphql_query_fixture("query { userStatsSummary { unigraphs { id key } } }", None, headers)
+    unigraph = next(u for u in response.json()["data"]["userStatsSummary"]["unigraphs"] if u["key"] == "q")
+
+    query = """
+        query Unigraph($id: ID!) {
+          unigraph(id: $id) { id key count accuracy }
+        }
+    """
+    response = await graphql_query_fixture(query, {"id": unigraph["id"]}, headers)
+    assert response.json()["data"]["unigraph"] == {"id": unigraph["id"], "key": "q", "count": 8, "accuracy": 75.0}
+
+    response = await graphql_query_fixture(query, {"id": "not-a-uuid"}, headers)
+    assert response.json() == {"data": {"unigraph": None}}
+
+
+@pytest.mark.asyncio
+async def test_practice_streaks(graphql_query_fixture, auth_token, session):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    mutation = """
+        mutation UpdateUser($timezone: String!) {
+            updateUser(timezone: $timezone) { timezone }
+        }
+    """
+    response = await graphql_query_fixture(mutation, {"timezone": "America/New_York"}, headers)
+    assert response.json()["data"]["updateUser"]["timezone"] == "America/New_York"
+    response = await graphql_query_fixture("query { users { timezone } }", None, headers)
+    assert {"timezone": "America/New_York"} in response.json()["data"]["users"]
+
+    response = await graphql_query_fixture(mutation, {"timezone": "Mars/Olympus"}, headers)
+    assert response.json()["errors"][0]["message"] == "Invalid input"
+
+    mutation = """
+        mutation CreateStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+            createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) { id }
+        }
+    """
+    # in New York: Dec 31, Jan 1, Jan 1, Jan 2, then a gap until Jan 5
+    for start_time in ["2024-01-01T03:00:00", "2024-01-01T15:00:00", "2024-01-01T23:00:00",
+                       "2024-01-02T15:00:00", "2024-01-05T15:00:00"]:
+        variables = {"userStatsSessionInput": {
+            "wpm": 50,
+            "practiceDuration": 1000,
+            "startTime": datetime.fromisoformat(start_time).replace(tzinfo=timezone.utc).timestamp(),
+        }}
+        response = await graphql_query_fixture(mutation, variables, headers)
+        assert "errors" not in response.json()
+
+    streaks = select(
+        UserStatsSummary.practice_streak, UserStatsSummary.longest_streak, UserStatsSummary.last_practice_date
+    )
+    assert (await session.execute(streaks)).one() == (1, 3, date(2024, 1, 5))
+
+    # Jan 5 is long gone, so the streak has lapsed by the time it's read
+    query = "query { userStatsSummary { practiceStreak longestStreak } }"
+    response = await graphql_query_fixture(query, None, headers)
+    assert response.json()["data"]["userStatsSummary"] == {"practiceStreak": 0, "longestStreak": 3}
+
+    # the set-based backfill agrees with what ingest worked out, and stores the lapsed streak as 0
+    await session.execute(update(UserStatsSummary).values(practice_streak=0, longest_streak=0, last_practice_date=None))
+    assert await backfill_practice_streaks(session) == 1
+    await session.commit()
+    assert (await session.execute(streaks)).one() == (0, 3, date(2024, 1, 5))
+
+    # practising today starts a new one
+    variables = {"userStatsSessionInput": {"wpm": 50, "practiceDuration": 1000}}
+    response = await graphql_query_fixture(mutation, variables, headers)
+    assert "errors" not in response.json()
+
+    response = await graphql_query_fixture(query, None, headers)
+    assert response.json()["data"]["userStatsSummary"] == {"practiceStreak": 1, "longestStreak": 3}
@@ -1,11 +1,15 @@
+import os
+import subprocess
+import sys
 from typing import Callable, Optional, Coroutine, Any
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
 import pytest
-from httpx import Response
+from httpx import ASGITransport, AsyncClient, Response
 from jose import jwt
 
+from api.factories.fastapi_app import create_app
 from api.settings import settings
 
 pytestmark = pytest.mark.asyncio
@@ -185,3 +189,75 @@ async def test_delete_user(graphql_query_fixture, auth_token):
     confirm_res = await graphql_query_fixture(query, None, headers)
     assert confirm_res.status_code == 200
     assert confirm_res.json()["data"]["user"] is None
+
+
+async def test_graphql_operation_shares_one_session(engine, session_maker, auth_token):
+    opened = []
+
+    def counting_session_maker():
+        opened.append(1)
+        return session_maker()
+
+    app = create_app(engine=engine, async_sessionmaker=counting_session_maker)
+    query = """
+        query {
+          user { id sessions { id } }
+          userStatsSessions { id }
+          userStatsSummary { totalSessions }
+        }
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            settings.GRAPHQL_ENDPOINT,
+            json={"query": query},
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    assert "errors" not in response.json()
+    # the user lookup and all four resolvers ran on the same session
+    assert len(opened) == 1
+
+
+async def test_graphql_schema_deferred_until_first_request(engine, session_maker, auth_token, monkeypatch):
+    monkeypatch.setattr(settings, "STARTUP_OPTIMIZED", True)
+    app = create_app(engine=engine, async_sessionmaker=session_maker)
+    assert app.state.graphql._app is None  # pylint: disable=protected-access
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            settings.GRAPHQL_ENDPOINT,
+            json={"query": "query { user { email } }"},
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    assert response.json()["data"]["user"]["email"].startswith("user-")
+    assert app.state.graphql._app is not None  # pylint: disable=protected-access
+
+
+REST_FIRST_COLD_START = """
+import asyncio
+from httpx import ASGITransport, AsyncClient
+from api.main import app
+from api.factories.database import Base
+
+async def main():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/auth/login", json={"email": "nobody@example.com", "password": "x"})
+    print(response.status_code, sorted(Base.metadata.tables))
+
+asyncio.run(main())
+"""
+
+
+async def test_rest_before_graphql_with_startup_optimized():
+    # a fresh interpreter, so nothing has imported the GraphQL resolvers (and the models they import) yet
+    result = subprocess.run(
+        [sys.executable, "-c", REST_FIRST_COLD_START],
+        env={**os.environ, "STARTUP_OPTIMIZED": "true"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    status, tables = result.stdout.strip().splitlines()[-1].split(" ", 1)
+    assert status == "400"
+    assert "digraphs" in tables and "user_stats_sessions" in tables
@@ -0,0 +1,131 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeAsyncRedis, FakeServer
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import select
+
+from api.controllers.user_stats_session_controller import create_user_stats_session
+from api.models.unigraph_model import Unigraph
+from api.models.user_stats_summary_model import UserStatsSummary
+from api.schemas.user_stats_session_schema import UserStatsSessionCreate
+from api.services import difficulty_cache as difficulty_cache_module, session_queue
+from api.services.corpus_service import ALL_DIGRAPHS, ALL_UNIGRAPHS, load_corpus
+from api.services.difficulty_cache import DifficultyCache
+from api.settings import settings
+
+# the worker runs with its own directory on the path, for its app package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "worker"))
+import main as worker  # pylint: disable=wrong-import-position,import-error
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def redis(monkeypatch):
+    client = FakeAsyncRedis(server=FakeServer())
+    monkeypatch.setattr(session_queue, "get_redis", lambda: client)
+    monkeypatch.setattr(difficulty_cache_module, "get_redis", lambda: client)
+    await worker.create_consumer_group(client)
+    yield client
+    await client.aclose()
+
+
+async def read(redis) -> list:
+    response = await redis.xreadgroup(worker.settings.CONSUMER_GROUP, "test", {worker.STREAM: ">"}, count=10)
+    return response[0][1]
+
+
+async def reclaim(redis) -> list:
+    return (await redis.xautoclaim(worker.STREAM, worker.settings.CONSUMER_GROUP, "other", min_idle_time=0))[1]
+
+
+async def pending(redis) -> int:
+    return (await redis.xpending(worker.STREAM, worker.settings.CONSUMER_GROUP))["pending"]
+
+
+async def total_sessions(session, user_id) -> int:
+    return await session.scalar(select(UserStatsSummary.total_sessions).where(UserStatsSummary.user_id == user_id))
+
+
+async def test_reclaimed_session_is_aggregated_once(redis, session, users, monkeypatch):
+    user = users[0]
+    data = UserStatsSessionCreate(wpm=60, accuracy=95, unigraphs={"a": {"count": 3, "accuracy": 100}})
+    await create_user_stats_session(user.id, data, session)
+    assert await total_sessions(session, user.id) is None  # left to the worker
+
+    async def lost(*_args):
+        raise RedisConnectionError("connection lost")
+
+    # the batch commits but its acknowledgement never arrives
+    with monkeypatch.context() as patch:
+        patch.setattr(redis, "xack", lost)
+        with pytest.raises(RedisConnectionError):
+            await worker.handle(redis, await read(redis))
+
+    # so it's still pending, and another consumer takes it over
+    await worker.handle(redis, await reclaim(redis))
+
+    assert await total_sessions(session, user.id) == 1
+    unigraph_counts = await session.scalars(
+        select(Unigraph.count).join(UserStatsSummary).where(UserStatsSummary.user_id == user.id)
+    )
+    assert unigraph_counts.all() == [3]
+    assert await pending(redis) == 0
+
+
+async def test_poison_session_is_dead_lettered(redis, session, users, monkeypatch):
+    monkeypatch.setattr(worker.settings, "MAX_DELIVERIES", 2)
+    user = users[0]
+
+    await create_user_stats_session(user.id, UserStatsSessionCreate(wpm=60), session)
+    # an entry queued before sessions carried their id, for a user who has since been deleted
+    poison = UserStatsSessionCreate(wpm=1, start_time=datetime.now(timezone.utc))
+    await redis.xadd(worker.STREAM, {"user_id": str(uuid4()), "session": poison.model_dump_json()})
+    await create_user_stats_session(user.id, UserStatsSessionCreate(wpm=70), session)
+
+    await worker.handle(redis, await read(redis))
+
+    # the sessions either side of it still go through
+    assert await total_sessions(session, user.id) == 2
+    assert await pending(redis) == 1
+
+    # and once it has failed MAX_DELIVERIES times it's moved aside
+    await worker.handle(redis, await reclaim(redis))
+
+    assert await pending(redis) == 0
+    dead = await redis.xrange(worker.settings.DEAD_LETTER_STREAM)
+    assert len(dead) == 1
+    assert b"error" in dead[0][1]
+    assert await total_sessions(session, user.id) == 2
+
+
+async def test_practice_text_follows_queued_session(redis, client, auth_token, users, session, monkeypatch):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    async def practise(unigraphs: dict, digraphs: dict | None = None):
+        data = UserStatsSessionCreate(wpm=60, unigraphs=unigraphs, digraphs=digraphs or {})
+        await create_user_stats_session(users[0].id, data, session)
+        await worker.handle(redis, await read(redis))
+
+    def letter_words(words: list[str], letter: str) -> int:
+        return sum(letter in word for word in words)
+
+    await practise(
+        {key: {"count": 1000, "accuracy": 0 if key == "q" else 100} for key in ALL_UNIGRAPHS},
+        {key: {"count": 1000, "accuracy": 100, "mean_interval": 100} for key in ALL_DIGRAPHS},
+    )
+    # caches the q-heavy vector
+    response = await client.post("/text/generate-practice-text", json={}, headers=headers)
+    assert letter_words(response.json()["text"].split(" "), "q") == letter_words(load_corpus().words, "q")
+
+    # the worker is another process, with its own cache object
+    monkeypatch.setattr(worker, "difficulty_cache", DifficultyCache(1, settings.DIFFICULTY_CACHE_TTL))
+    await practise({"q": {"count": 100000, "accuracy": 100}, "z": {"count": 100000, "accuracy": 0}})
+
+    response = await client.post("/text/generate-practice-text", json={}, headers=headers)
+    assert letter_words(response.json()["text"].split(" "), "z") == letter_words(load_corpus().words, "z")
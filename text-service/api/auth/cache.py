@@ -0,0 +1,60 @@
+from hashlib import sha256
+from time import time
+from typing import Optional
+from uuid import UUID
+
+from ..models.user_model import User
+from ..settings import settings
+from ..utils.cache import ExpiringCache
+
+
+class TokenCache:
+    """Verified access tokens -> user id, kept until the token itself expires.
+
+    Keyed by a hash so raw tokens aren't held in memory. Only tokens that
+    verified are cached, so bad tokens can't push good ones out.
+    """
+
+    def __init__(self, max_size: int):
+        self._entries: ExpiringCache[UUID] = ExpiringCache(max_size)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[UUID]:
+        return self._entries.get(self._key(token))
+
+    def set(self, token: str, user_id: UUID, expires_at: float) -> None:
+        self._entries.set(self._key(token), user_id, expires_at)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class UserCache:
+    """Authenticated users by id for USER_CACHE_TTL seconds, as instances detached from any session.
+
+    Changes to a user invalidate them here; other processes only drop theirs
+    by TTL, which bounds how stale a principal can get.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.ttl = ttl
+        self._entries: ExpiringCache[User] = ExpiringCache(max_size)
+
+    def get(self, user_id: UUID) -> Optional[User]:
+        return self._entries.get(user_id)
+
+    def set(self, user: User) -> None:
+        self._entries.set(user.id, user, time() + self.ttl)
+
+    def invalidate(self, user_id: UUID) -> None:
+        self._entries.invalidate(user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
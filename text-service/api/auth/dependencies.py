@@ -1,8 +1,12 @@
+from typing import Optional
+from uuid import UUID
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from ..auth.cache import token_cache, user_cache
 from ..auth.jwt import decode_access_token
 from ..factories.database import get_db
 from ..models.user_model import User
@@ -11,34 +15,54 @@ from ..models.user_model import User
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_token_credentials(token: str = Depends(oauth2_scheme)) -> str:
-    payload = decode_access_token(token)
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 
+def get_token_credentials(token: str = Depends(oauth2_scheme)) -> UUID:
+    # a token that verified once stays valid until it expires, so it isn't decoded again
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    payload = decode_access_token(token)
     if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise credentials_exception()
 
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    try:
+        user_id = UUID(payload.get("sub"))
+    except (TypeError, ValueError) as e:
+        raise credentials_exception() from e
 
+    if "exp" in payload:
+        token_cache.set(token, user_id, payload["exp"])
     return user_id
 
 
+async def load_user(user_id: UUID, db: AsyncSession) -> Optional[User]:
+    """The user for an authenticated request, from the principal cache when it's there."""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        # shared between requests, so it mustn't stay attached to this one's session
+        db.expunge(user)
+        user_cache.set(user)
+    return user
+
 
 async def get_current_user(
-    user_id: str = Depends(get_token_credentials),
+    user_id: UUID = Depends(get_token_credentials),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    result = await db.execute(select(User).where(User.id == user_id))
-    user: User = result.scalar_one_or_none()
+    user = await load_user(user_id, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -15,7 +15,7 @@ from ..controllers.users_controller import create_user, get_user_by_id
 
 from .dependencies import get_current_user
 from .jwt import create_access_token, verify_reset_token, generate_reset_token
-from .security import verify_password, pwd_context
+from .security import password_hasher
 from ..services.reset_password_service import send_reset_email
 from ..services.users_service import get_user_by_email, update_user_password
 
@@ -24,7 +24,7 @@ auth_router = APIRouter(prefix="/auth", tags=["auth"])
 
 @auth_router.post("/register")
 async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
-    hashed_password = pwd_context.hash(data.password)
+    hashed_password = await password_hasher.hash(data.password)
     user_in = UserCreate(
         email=data.email,
         user_name=data.user_name,
@@ -49,7 +49,7 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(data.password, user.hashed_password):  # type: ignore
+    if not user or not await password_hasher.verify(data.password, user.hashed_password):  # type: ignore
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     token = create_access_token({"sub": str(user.id)})
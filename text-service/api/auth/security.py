@@ -1,5 +1,12 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
 from passlib.context import CryptContext
 
+from ..settings import settings
+from ..utils.logger import logger
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -7,3 +14,75 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    def __init__(self):
+        super().__init__("Too many password requests, try again shortly")
+
+
+class PasswordHasher:
+    """bcrypt on a small dedicated thread pool, so hashing never blocks the event loop.
+
+    bcrypt releases the GIL, so the pool's threads hash in parallel. At most
+    ``max_pending`` calls can be queued or running at once; past that callers get
+    ``PasswordHasherBusy`` straight away rather than waiting behind a login storm.
+    Counters are only touched on the event loop.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # created on first use so importing the app doesn't start threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Password hashing rejected with {self.pending} calls pending")
+            raise PasswordHasherBusy()
+
+        self.pending += 1
+        started = monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += monotonic() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            # calls waiting for a free thread, as opposed to hashing on one
+            "queued": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "mean_seconds": self.total_seconds / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
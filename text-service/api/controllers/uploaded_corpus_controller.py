@@ -0,0 +1,39 @@
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.uploaded_corpus_model import UploadedCorpus
+from ..models.user_model import User
+
+
+async def save_uploaded_corpus(user_id: UUID, name: str, words: list[str], max_corpora: int, db: AsyncSession) -> bool:
+    """Store (or replace) one of a user's word lists; False if they already have ``max_corpora`` others."""
+    # serialises a user's uploads so concurrent ones can't both slip under the cap
+    await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+
+    others = await db.scalar(
+        select(func.count())
+        .select_from(UploadedCorpus)
+        .where(UploadedCorpus.user_id == user_id, UploadedCorpus.name != name)
+    )
+    if others >= max_corpora:
+        await db.rollback()
+        return False
+
+    stmt = insert(UploadedCorpus).values(user_id=user_id, name=name, words=words)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UploadedCorpus.user_id, UploadedCorpus.name],
+            set_={"words": stmt.excluded.words, "created_at": func.now()},
+        )
+    )
+    await db.commit()
+    return True
+
+
+async def get_uploaded_corpus_words(user_id: UUID, name: str, db: AsyncSession) -> list[str] | None:
+    return await db.scalar(
+        select(UploadedCorpus.words).where(UploadedCorpus.user_id == user_id, UploadedCorpus.name == name)
+    )
@@ -0,0 +1,128 @@
+from datetime import date
+from typing import Literal, Sequence
+from uuid import UUID
+
+from sqlalchemy import Date, DateTime, Float, Integer, cast, column, func, select, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.user_daily_stats_model import UserDailyStats
+from ..models.user_model import User
+from ..schemas.user_stats_session_schema import UserStatsSessionCreate
+
+Granularity = Literal["day", "week", "month"]
+
+
+# session columns summed into the rollup, with the SQL type they're sent as
+DAILY_COLUMNS = {
+    "practice_duration": Integer,
+    "wpm": Integer,
+    "net_wpm": Integer,
+    "accuracy": Float,
+    "raw_accuracy": Float,
+}
+
+
+def session_day(start_time):
+    """The day in the user's time zone a session counts towards, the same day its streak uses.
+
+    Needs ``users`` in the FROM clause.
+    """
+    return cast(func.timezone(User.timezone, func.coalesce(start_time, func.now())), Date)
+
+
+async def upsert_daily_stats(sessions: Sequence[tuple[UUID, UserStatsSessionCreate]], db: AsyncSession):
+    """Fold ``(user_id, session)`` pairs into the per-day rollups with a single upsert. The caller commits."""
+    if not sessions:
+        return
+
+    rows = values(
+        column("user_id", PG_UUID(as_uuid=True)),
+        column("start_time", DateTime(timezone=True)),
+        *(column(name, type_) for name, type_ in DAILY_COLUMNS.items()),
+        name="daily_sessions",
+    ).data([
+        (user_id, data.start_time, *(getattr(data, name) for name in DAILY_COLUMNS))
+        for user_id, data in sessions
+    ])
+    # a column that's NULL in every row comes back untyped, so cast on the way out
+    row = {name: cast(rows.c[name], type_) for name, type_ in DAILY_COLUMNS.items()}
+    day = session_day(cast(rows.c.start_time, DateTime(timezone=True)))
+
+    def total(column_):
+        return func.coalesce(func.sum(column_), 0)
+
+    # an upsert can only touch each row once, so sessions on the same day are combined first
+    combined = (
+        select(
+            rows.c.user_id,
+            day,
+            func.count(),
+            total(row["practice_duration"]),
+            total(row["wpm"]),
+            total(row["net_wpm"]),
+            func.coalesce(func.max(row["wpm"]), 0),
+            total(row["accuracy"]),
+            total(row["raw_accuracy"]),
+        )
+        .join_from(rows, User, User.id == rows.c.user_id)
+        .group_by(rows.c.user_id, day)
+        # sorted so concurrent batches lock rows in the same order
+        .order_by(rows.c.user_id, day)
+    )
+    stmt = insert(UserDailyStats).from_select(
+        [
+            "user_id", "day", "sessions", "practice_duration", "total_wpm", "total_net_wpm", "fastest_wpm",
+            "total_accuracy", "total_raw_accuracy",
+        ],
+        combined,
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserDailyStats.user_id, UserDailyStats.day],
+        set_={
+            "sessions": UserDailyStats.sessions + stmt.excluded.sessions,
+            "practice_duration": UserDailyStats.practice_duration + stmt.excluded.practice_duration,
+            "total_wpm": UserDailyStats.total_wpm + stmt.excluded.total_wpm,
+            "total_net_wpm": UserDailyStats.total_net_wpm + stmt.excluded.total_net_wpm,
+            "fastest_wpm": func.greatest(UserDailyStats.fastest_wpm, stmt.excluded.fastest_wpm),
+            "total_accuracy": UserDailyStats.total_accuracy + stmt.excluded.total_accuracy,
+            "total_raw_accuracy": UserDailyStats.total_raw_accuracy + stmt.excluded.total_raw_accuracy,
+        },
+    ))
+
+
+async def get_user_daily_stats(
+    user_id: UUID,
+    start_date: date,
+    end_date: date,
+    granularity: Granularity,
+    db: AsyncSession,
+):
+    """The user's rollups from ``start_date`` to ``end_date`` inclusive, summed per day, week or month.
+
+    Rows carry ``period`` (the first day of the bucket; weeks start on Monday) and
+    the summed columns, oldest first.
+    """
+    # truncated as a plain timestamp, so the session time zone can't shift the bucket
+    period = cast(func.date_trunc(granularity, cast(UserDailyStats.day, DateTime)), Date).label("period")
+
+    result = await db.execute(
+        select(
+            period,
+            func.sum(UserDailyStats.sessions).label("sessions"),
+            func.sum(UserDailyStats.practice_duration).label("practice_duration"),
+            func.sum(UserDailyStats.total_wpm).label("total_wpm"),
+            func.sum(UserDailyStats.total_net_wpm).label("total_net_wpm"),
+            func.max(UserDailyStats.fastest_wpm).label("fastest_wpm"),
+            func.sum(UserDailyStats.total_accuracy).label("total_accuracy"),
+            func.sum(UserDailyStats.total_raw_accuracy).label("total_raw_accuracy"),
+        )
+        .where(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.day >= start_date,
+            UserDailyStats.day <= end_date,
+        )
+        .group_by(period)
+        .order_by(period)
+    )
+    return result.all()
@@ -1,21 +1,40 @@
 from datetime import datetime
 from uuid import UUID
-from decimal import Decimal
-from typing import Optional, Sequence, cast
+from typing import AsyncIterator, Optional, Sequence
 
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import DateTime, Float, Integer, Numeric, case, cast, column, func, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
 
-from .user_stats_summary_controller import create_user_stats_summary, upsert_graphs
+from .user_daily_stats_controller import session_day, upsert_daily_stats
+from .user_stats_summary_controller import upsert_graphs
 from ..factories.database import get_db
-from ..graphql.types.user_stats_summary_type import UserStatsSummaryType
-from ..models.unigraph_model import Unigraph
+from ..models.user_model import User
 from ..models.user_stats_session_model import UserStatsSession
 from ..graphql.types.user_stats_session_type import UserStatsSessionType
 from ..models.user_stats_summary_model import UserStatsSummary
 from ..schemas.user_stats_session_schema import UserStatsSessionCreate
+from ..services.difficulty_cache import difficulty_cache
+from ..services.session_queue import publish_session, session_queue_enabled
+
+
+# rows fetched per round trip when streaming session history
+SESSION_STREAM_BATCH = 500
+
+# session columns folded into the summary, with the SQL type they're sent as
+SESSION_DELTAS = {
+    "wpm": Integer,
+    "net_wpm": Integer,
+    "accuracy": Float,
+    "raw_accuracy": Float,
+    "practice_duration": Integer,
+    "corrected_char_count": Integer,
+    "deleted_char_count": Integer,
+    "total_keystrokes": Integer,
+    "total_char_count": Integer,
+    "error_char_count": Integer,
+}
 
 
 async def create_user_stats_session(
@@ -23,108 +42,177 @@ async def create_user_stats_session(
     input_data: UserStatsSessionCreate,
     db: AsyncSession = Depends(get_db)
 ) -> UserStatsSessionType:
-    new_session = UserStatsSession(user_id=user_id, **input_data.model_dump(exclude={"unigraphs", "digraphs"}))
-    db.add(new_session)
-    await db.flush()
-    await db.refresh(new_session)
-
-    result = await db.execute(
-        select(UserStatsSummary)
-        .options(selectinload(UserStatsSummary.unigraphs))
-        .where(UserStatsSummary.user_id == user_id)
+    queued = session_queue_enabled()
+    new_session = await db.scalar(
+        insert(UserStatsSession)
+        .values(
+            user_id=user_id,
+            aggregated=not queued,
+            # omitted rather than NULL so start_time falls back to its server default
+            **input_data.model_dump(exclude={"unigraphs", "digraphs"}, exclude_none=True),
+        )
+        .returning(UserStatsSession)
     )
-    summary = result.scalars().first()
+    # aggregated against the stored start time, which the database fills in when the client sent none
+    input_data = input_data.model_copy(update={"start_time": new_session.start_time})
 
-    # noinspection PyUnreachableCode
-    if summary:
-        await apply_session_to_summary(summary, input_data)
-    else:
-        summary = await create_user_stats_summary(user_id, None, db)
-        await apply_session_to_summary(summary, input_data)
+    if queued:
+        # only the raw session is written here; the worker aggregates it and then invalidates the
+        # user's difficulty vector in Redis, which every API process reads it from
+        await db.commit()
+        if await publish_session(user_id, new_session.id, input_data):
+            return new_session
+        await claim_sessions([(new_session.id, new_session.start_time)], db)
 
-    await upsert_graphs(db, summary.id, input_data)
+    await apply_sessions_to_summaries([(user_id, input_data)], db)
 
     await db.commit()
+    await difficulty_cache.invalidate(user_id)
     return new_session
 
 
-async def apply_session_to_summary(summary: UserStatsSummaryType, data: UserStatsSessionCreate) -> None:
-    summary.total_sessions += 1
-    summary.total_practice_duration += data.practice_duration or 0
-
-    if summary.total_sessions == 1:
-        summary.average_wpm = data.wpm or 0
-        summary.average_net_wpm = data.net_wpm or 0
-        summary.average_accuracy = float(round(Decimal(str(data.accuracy or 0)), 1))
-        summary.average_raw_accuracy = float(round(Decimal(str(data.raw_accuracy or 0)), 1))
-    else:
-        summary.average_wpm = round(
-            ((summary.average_wpm * (summary.total_sessions - 1)) + (data.wpm or 0)) / summary.total_sessions
-        )
-
-        summary.average_net_wpm = round(
-            ((summary.average_net_wpm * (summary.total_sessions - 1)) + (data.net_wpm or 0)) / summary.total_sessions
-        )
-
-        new_accuracy = (
-            (Decimal(cast(float, summary.average_accuracy)) * (summary.total_sessions - 1)) +
-            Decimal(str(data.accuracy or 0))
-        ) / summary.total_sessions
-        summary.average_accuracy = float(round(new_accuracy, 1))
-
-        new_raw_accuracy = (
-            (Decimal(cast(float, summary.average_raw_accuracy)) * (summary.total_sessions - 1)) +
-            Decimal(str(data.raw_accuracy or 0))
-        ) / summary.total_sessions
-        summary.average_raw_accuracy = float(round(new_raw_accuracy, 1))
-
-    if data.wpm and data.wpm > (summary.fastest_wpm or 0):
-        summary.fastest_wpm = data.wpm
-
-    if data.net_wpm and data.net_wpm > (summary.fastest_net_wpm or 0):
-        summary.fastest_net_wpm = data.net_wpm
-
-    summary.total_corrected_char_count += data.corrected_char_count or 0
-    summary.total_deleted_char_count += data.deleted_char_count or 0
-    summary.total_keystrokes += data.total_keystrokes or 0
-    summary.total_char_count += data.total_char_count or 0
-    summary.error_char_count += data.error_char_count or 0
-
-    # --- Update unigraphs ---
-    if data.unigraphs:
-        unigraph_dict = {u.key: u for u in summary.unigraphs}
+async def claim_sessions(keys: Sequence[tuple[UUID, datetime]], db: AsyncSession) -> set[UUID]:
+    """Mark ``(id, start_time)`` sessions aggregated; returns the ids that weren't already.
 
-        for char, stats in data.unigraphs.items():
-            if char not in unigraph_dict:
-                unigraph_dict[char] = Unigraph(key=char, count=0, accuracy=0, mistyped={})
-                summary.unigraphs.append(unigraph_dict[char])
+    The caller applies exactly those in the same transaction. A second claim of
+    the same session waits on the first's row lock and then finds it taken, so
+    a redelivered queue entry is never counted twice.
+    """
+    if not keys:
+        return set()
 
-            new_count = getattr(stats, "count", 0)
-            new_accuracy = getattr(stats, "accuracy", 0.0) # between 0–100
-            new_mistyped = getattr(stats, "mistyped", {})
-
-            unigraph = unigraph_dict[char]
-            existing_count = unigraph.count
-            existing_accuracy = unigraph.accuracy
-
-            # Only compute weighted accuracy if new data exists
-            if new_count > 0:
-                updated_accuracy = (
-                    (existing_accuracy * existing_count) + (new_accuracy * new_count)
-                ) / (existing_count + new_count)
-
-                unigraph.accuracy = int(round(updated_accuracy))
+    result = await db.execute(
+        update(UserStatsSession)
+        # start_time lets the update go straight to each session's partition
+        .where(tuple_(UserStatsSession.id, UserStatsSession.start_time).in_(keys))
+        .where(UserStatsSession.aggregated.is_(False))
+        .values(aggregated=True)
+        .returning(UserStatsSession.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars())
+
+
+async def apply_sessions_to_summaries(
+    sessions: Sequence[tuple[UUID, UserStatsSessionCreate]],
+    db: AsyncSession
+) -> set[UUID]:
+    """Fold ``(user_id, session)`` pairs into summaries, n-gram rows and daily rollups; returns the users affected.
+
+    Sessions are applied in rounds holding at most one session per user, so a
+    round is one summary UPDATE and one upsert per n-gram table however many
+    users it covers. The caller commits.
+    """
+    rounds: list[list[tuple[UUID, UserStatsSessionCreate]]] = []
+    applied: dict[UUID, int] = {}
+    for user_id, data in sessions:
+        index = applied.get(user_id, 0)
+        applied[user_id] = index + 1
+        if index == len(rounds):
+            rounds.append([])
+        rounds[index].append((user_id, data))
+
+    for batch in rounds:
+        summary_ids = await apply_session_deltas(batch, db)
+
+        missing = [(user_id, data) for user_id, data in batch if user_id not in summary_ids]
+        if missing:
+            # first sessions for these users: start from empty summaries and apply to those.
+            # a concurrent first session may have created one already, which the update then finds
+            await db.execute(insert(UserStatsSummary).values([
+                {
+                    "user_id": user_id,
+                    "total_sessions": 0,
+                    "total_corrected_char_count": 0,
+                    "total_deleted_char_count": 0,
+                    "total_keystrokes": 0,
+                    "total_char_count": 0,
+                    "error_char_count": 0,
+                }
+                for user_id, _ in missing
+            ]).on_conflict_do_nothing(index_elements=["user_id"]))
+            summary_ids.update(await apply_session_deltas(missing, db))
+
+        await upsert_graphs(db, [(summary_ids[user_id], data) for user_id, data in batch])
+
+    await upsert_daily_stats(sessions, db)
+
+    return set(applied)
+
+
+def running_average(column, sessions, value, places: int = 0):
+    """The mean over ``sessions + 1`` sessions once ``value`` is folded into ``column``."""
+    total = func.coalesce(column, 0) * sessions + func.coalesce(value, 0)
+    return func.round(cast(total, Numeric) / (sessions + 1), places)
+
+
+def practice_streak(day):
+    """The summary's streak once a session on ``day`` (in the user's time zone) is counted."""
+    last = UserStatsSummary.last_practice_date
+    return case(
+        (last.is_(None), 1),
+        (day == last + 1, func.coalesce(UserStatsSummary.practice_streak, 0) + 1),
+        (day > last, 1),
+        # another session the same day, or a late one from before it, leaves the streak as it is
+        else_=UserStatsSummary.practice_streak,
+    )
 
-            # Update count AFTER accuracy is computed
-            unigraph.count += new_count
 
-            # noinspection PyUnreachableCode
-            # Merge mistyped stats
-            if not isinstance(unigraph.mistyped, dict):
-                unigraph.mistyped = {}
+async def apply_session_deltas(
+    batch: Sequence[tuple[UUID, UserStatsSessionCreate]],
+    db: AsyncSession
+) -> dict[UUID, UUID]:
+    """One UPDATE ... FROM (VALUES ...) folding a session into each user's summary; returns user id -> summary id.
+
+    Every column is computed from its current value inside the database, so
+    concurrent submissions queue on the row lock instead of overwriting each other.
+    """
+    deltas = values(
+        column("user_id", PG_UUID(as_uuid=True)),
+        column("start_time", DateTime(timezone=True)),
+        *(column(name, type_) for name, type_ in SESSION_DELTAS.items()),
+        name="deltas",
+    ).data([
+        (user_id, data.start_time, *(getattr(data, name) for name in SESSION_DELTAS))
+        for user_id, data in batch
+    ])
+
+    # a column that's NULL in every row comes back untyped, so cast on the way out
+    delta = {name: cast(deltas.c[name], type_) for name, type_ in SESSION_DELTAS.items()}
+    sessions = func.coalesce(UserStatsSummary.total_sessions, 0)
+    day = session_day(cast(deltas.c.start_time, DateTime(timezone=True)))
+
+    def add(column_, delta):
+        return func.coalesce(column_, 0) + func.coalesce(delta, 0)
 
-            for mistyped_char, count in new_mistyped.items():
-                unigraph.mistyped[mistyped_char] = unigraph.mistyped.get(mistyped_char, 0) + count
+    result = await db.execute(
+        update(UserStatsSummary)
+        .where(UserStatsSummary.user_id == deltas.c.user_id, User.id == deltas.c.user_id)
+        .values(
+            total_sessions=sessions + 1,
+            total_practice_duration=add(UserStatsSummary.total_practice_duration, delta["practice_duration"]),
+            average_wpm=running_average(UserStatsSummary.average_wpm, sessions, delta["wpm"]),
+            average_net_wpm=running_average(UserStatsSummary.average_net_wpm, sessions, delta["net_wpm"]),
+            average_accuracy=running_average(UserStatsSummary.average_accuracy, sessions, delta["accuracy"], 1),
+            average_raw_accuracy=running_average(
+                UserStatsSummary.average_raw_accuracy, sessions, delta["raw_accuracy"], 1
+            ),
+            # greatest() skips NULLs, so sessions without a wpm leave these alone
+            fastest_wpm=func.greatest(UserStatsSummary.fastest_wpm, delta["wpm"]),
+            fastest_net_wpm=func.greatest(UserStatsSummary.fastest_net_wpm, delta["net_wpm"]),
+            total_corrected_char_count=add(UserStatsSummary.total_corrected_char_count, delta["corrected_char_count"]),
+            total_deleted_char_count=add(UserStatsSummary.total_deleted_char_count, delta["deleted_char_count"]),
+            total_keystrokes=add(UserStatsSummary.total_keystrokes, delta["total_keystrokes"]),
+            total_char_count=add(UserStatsSummary.total_char_count, delta["total_char_count"]),
+            error_char_count=add(UserStatsSummary.error_char_count, delta["error_char_count"]),
+            practice_streak=practice_streak(day),
+            longest_streak=func.greatest(func.coalesce(UserStatsSummary.longest_streak, 0), practice_streak(day)),
+            last_practice_date=func.greatest(UserStatsSummary.last_practice_date, day),
+        )
+        .returning(UserStatsSummary.user_id, UserStatsSummary.id)
+        .execution_options(synchronize_session=False)
+    )
+    return {user_id: summary_id for user_id, summary_id in result.all()}
 
 
 async def get_user_stats_session_by_id(
@@ -133,27 +221,49 @@ async def get_user_stats_session_by_id(
     return await db.get(UserStatsSession, session_id)
 
 
+async def stream_user_stats_sessions(
+    user_id: UUID,
+    db: AsyncSession,
+    limit: int | None = None,
+    after: tuple[datetime, UUID] | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+) -> AsyncIterator[UserStatsSession]:
+    """A user's sessions, newest first, streamed from a server-side cursor rather than buffered.
+
+    ``after`` is a ``(start_time, id)`` keyset position; only sessions before it are returned.
+    """
+    stmt = select(UserStatsSession).where(UserStatsSession.user_id == user_id)
+    if start_date is not None:
+        stmt = stmt.where(UserStatsSession.start_time >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(UserStatsSession.end_time <= end_date)
+    if after is not None:
+        stmt = stmt.where(tuple_(UserStatsSession.start_time, UserStatsSession.id) < tuple_(*after))
+
+    stmt = stmt.order_by(UserStatsSession.start_time.desc(), UserStatsSession.id.desc()).limit(limit)
+
+    result = await db.stream_scalars(stmt.execution_options(yield_per=SESSION_STREAM_BATCH))
+    async for session in result:
+        yield session
+
+
 async def get_user_stats_sessions_by_date_range(
     user_id: UUID,
     start_date: datetime,
     end_date: datetime,
     db: AsyncSession = Depends(get_db)
-) -> Sequence[UserStatsSession]:
-    result = await db.execute(
+) -> AsyncIterator[UserStatsSession]:
+    result = await db.stream_scalars(
         select(UserStatsSession)
         .where(UserStatsSession.user_id == user_id)
         .where(UserStatsSession.start_time >= start_date)
         .where(UserStatsSession.end_time <= end_date)
         .order_by(UserStatsSession.start_time)
+        .execution_options(yield_per=SESSION_STREAM_BATCH)
     )
-    return result.scalars().all()
-
-
-async def get_all_user_stats_sessions(
-    db: AsyncSession = Depends(get_db)
-) -> Sequence[UserStatsSession]:
-    result = await db.execute(select(UserStatsSession))
-    return result.scalars().all()
+    async for session in result:
+        yield session
 
 
 # async def update_user_stats_session(
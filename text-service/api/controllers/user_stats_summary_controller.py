@@ -1,9 +1,11 @@
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
 from uuid import UUID
+from zoneinfo import ZoneInfo
 
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Float, case, cast, func, literal_column, select
 from sqlalchemy.orm import selectinload
 
 from ..models.digraph_model import Digraph
@@ -12,6 +14,19 @@ from ..models.user_stats_summary_model import UserStatsSummary
 from ..graphql.types.user_stats_summary_type import UserStatsSummaryCreateInput, UserStatsSummaryUpdateInput, \
     UserStatsSummaryType
 from ..schemas.user_stats_session_schema import UserStatsSessionCreate
+from ..services.difficulty_cache import difficulty_cache
+
+
+def current_practice_streak(summary: UserStatsSummary, timezone: str) -> int:
+    """The stored streak, or 0 once a whole day in the user's time zone has gone by without practice.
+
+    Streaks are only updated when a session comes in, so one that has lapsed
+    still holds its last value until then.
+    """
+    yesterday = datetime.now(ZoneInfo(timezone)).date() - timedelta(days=1)
+    if summary.last_practice_date is not None and summary.last_practice_date < yesterday:
+        return 0
+    return summary.practice_streak
 
 
 async def create_user_stats_summary(
@@ -88,6 +103,7 @@ async def create_user_stats_summary(
 
     await db.commit()
     await db.refresh(summary)
+    await difficulty_cache.invalidate(user_id)
 
     return summary
 
@@ -166,46 +182,99 @@ async def update_user_stats_summary(
 
         await db.commit()
         await db.refresh(summary)
+        await difficulty_cache.invalidate(user_id)
         return summary
 
     return None
 
 
-async def upsert_graphs(db: AsyncSession, summary_id: UUID, data: UserStatsSessionCreate):
-    if data.unigraphs:
-        for key, stat in data.unigraphs.items():
-            stmt = insert(Unigraph).values(
-                user_stats_summary_id=summary_id,
-                key=key,
-                count=stat.count,
-                accuracy=stat.accuracy,
-                mistyped=stat.mistyped
-            ).on_conflict_do_update(
-                index_elements=['user_stats_summary_id', 'key'],
-                set_={
-                    'count': stat.count,
-                    'accuracy': stat.accuracy,
-                }
+# mistyped JSON of the existing row plus the incoming one, summing counts per character
+MERGED_MISTYPED = literal_column("""(
+    SELECT coalesce(jsonb_object_agg(merged.key, merged.count), '{}'::jsonb)
+    FROM (
+        SELECT key, sum(value::int) AS count
+        FROM (
+            SELECT * FROM jsonb_each_text(
+                CASE jsonb_typeof(unigraphs.mistyped) WHEN 'object' THEN unigraphs.mistyped ELSE '{}'::jsonb END
             )
-            await db.execute(stmt)
+            UNION ALL
+            SELECT * FROM jsonb_each_text(excluded.mistyped)
+        ) AS entries
+        GROUP BY key
+    ) AS merged
+)""")
 
-    if data.digraphs:
-        for key, stat in data.digraphs.items():
-            stmt = insert(Digraph).values(
-                user_stats_summary_id=summary_id,
-                key=key,
-                count=stat.count,
-                accuracy=stat.accuracy,
-                mean_interval=stat.mean_interval,
-            ).on_conflict_do_update(
-                index_elements=['user_stats_summary_id', 'key'],
-                set_={
-                    'count': stat.count,
-                    'accuracy': stat.accuracy,
-                    'mean_interval': stat.mean_interval,
-                }
-            )
-            await db.execute(stmt)
+
+def weighted_average(current, current_count, incoming, incoming_count):
+    """Count-weighted mean of an existing n-gram stat and the incoming one, rounded like the client shows it."""
+    total = current_count + incoming_count
+    return case(
+        (incoming_count > 0, func.round((current * current_count + incoming * incoming_count) / cast(total, Float))),
+        else_=current,
+    )
+
+
+async def upsert_graphs(db: AsyncSession, graphs: Iterable[tuple[UUID, UserStatsSessionCreate]]):
+    """Merge sessions' n-grams into their summaries' unigraph and digraph rows.
+
+    Takes ``(summary_id, session)`` pairs with at most one session per summary,
+    since a multi-row ON CONFLICT can't touch the same row twice.
+    """
+    graphs = list(graphs)
+    # one multi-row INSERT ... ON CONFLICT per table rather than a statement per key;
+    # the merge happens in the database so concurrent sessions can't lose each other's counts
+    unigraph_rows = [
+        {
+            "user_stats_summary_id": summary_id,
+            "key": key,
+            "count": stat.count,
+            "accuracy": stat.accuracy,
+            "mistyped": stat.mistyped or {},
+        }
+        for summary_id, data in graphs
+        for key, stat in (data.unigraphs or {}).items()
+    ]
+    if unigraph_rows:
+        stmt = insert(Unigraph).values(unigraph_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_stats_summary_id', 'key'],
+            set_={
+                'count': Unigraph.count + stmt.excluded.count,
+                'accuracy': weighted_average(
+                    Unigraph.accuracy, Unigraph.count, stmt.excluded.accuracy, stmt.excluded.count
+                ),
+                'mistyped': MERGED_MISTYPED,
+            }
+        )
+        await db.execute(stmt)
+
+    digraph_rows = [
+        {
+            "user_stats_summary_id": summary_id,
+            "key": key,
+            "count": stat.count,
+            "accuracy": stat.accuracy,
+            "mean_interval": stat.mean_interval,
+        }
+        for summary_id, data in graphs
+        for key, stat in (data.digraphs or {}).items()
+    ]
+    if digraph_rows:
+        stmt = insert(Digraph).values(digraph_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_stats_summary_id', 'key'],
+            set_={
+                'count': Digraph.count + stmt.excluded.count,
+                'accuracy': weighted_average(
+                    Digraph.accuracy, Digraph.count, stmt.excluded.accuracy, stmt.excluded.count
+                ),
+                'mean_interval': weighted_average(
+                    func.coalesce(Digraph.mean_interval, stmt.excluded.mean_interval), Digraph.count,
+                    stmt.excluded.mean_interval, stmt.excluded.count
+                ),
+            }
+        )
+        await db.execute(stmt)
 
 
 async def insert_graphs(db: AsyncSession, summary_id: UUID, data: UserStatsSessionCreate):
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 
+from ..auth.cache import user_cache
 from ..models.user_model import User
 from ..schemas.user_schema import UserCreate, UserUpdate
 
@@ -45,6 +46,7 @@ async def update_user(user: UserUpdate, user_id: UUID, db: AsyncSession) -> Opti
 
     try:
         await db.commit()
+        user_cache.invalidate(user_id)
         await db.refresh(existing_user)
         return existing_user
     except IntegrityError as e:
@@ -61,4 +63,5 @@ async def delete_user(user_id: UUID, db: AsyncSession) -> bool:
         return False
     await db.delete(user)
     await db.commit()
+    user_cache.invalidate(user_id)
     return True
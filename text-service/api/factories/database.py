@@ -1,3 +1,5 @@
+import asyncio
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import NullPool
@@ -6,7 +8,28 @@ from api.settings import settings
 
 Base = declarative_base()
 
-db_engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)#, future=True)
+
+def engine_options() -> dict:
+    """Pooling arguments for ``create_async_engine`` from ``settings.db_pool_mode``."""
+    mode = settings.db_pool_mode
+    if mode == "queue":
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        }
+
+    options = {"poolclass": NullPool}
+    if mode == "pgbouncer":
+        # transaction pooling hands each transaction a different server connection,
+        # so prepared statements can't be cached between them
+        options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return options
+
+
+db_engine = create_async_engine(settings.DATABASE_URL, **engine_options())
 
 async_sessionmaker_instance = async_sessionmaker(
     bind=db_engine,
@@ -17,3 +40,40 @@ async_sessionmaker_instance = async_sessionmaker(
 async def get_db():
     async with async_sessionmaker_instance() as session:
         yield session
+
+
+class RequestSession:
+    """One lazily opened session shared by everything in a request; used like a session maker.
+
+    ``async with request_session() as db`` hands back the same session each time
+    and holds a lock while it's in use, since sibling GraphQL fields resolve
+    concurrently and an ``AsyncSession`` can't run two statements at once.
+    The owner calls ``close`` when the request is done.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]):
+        self._session_maker = session_maker
+        self._session: AsyncSession | None = None
+        self._lock = asyncio.Lock()
+
+    def __call__(self) -> "RequestSession":
+        return self
+
+    async def __aenter__(self) -> AsyncSession:
+        await self._lock.acquire()
+        if self._session is None:
+            self._session = self._session_maker()
+        return self._session
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is not None:
+                # leave the session usable for the other fields in the request
+                await self._session.rollback()
+        finally:
+            self._lock.release()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
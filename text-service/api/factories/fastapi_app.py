@@ -1,14 +1,17 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from ..auth.routes import auth_router
+from ..auth.security import PasswordHasherBusy, password_hasher
 from .database import Base, db_engine, async_sessionmaker_instance
-from ..routers.graphql_router import create_graphql_router
 from ..routers.text_router import text_router
 from ..schemas import WaitlistRequestPayload
+from ..services import get_ses, get_sns
+from ..services.corpus_service import load_corpus
 from ..services.waitlist_service import add_to_waitlist
 from ..settings import settings
 from ..utils.logger import logger
@@ -19,11 +22,55 @@ async def async_create_tables(engine: AsyncEngine):
         await conn.run_sync(Base.metadata.create_all)
 
 
-def get_lifespan(_engine: AsyncEngine):
+def create_graphql_app(session_maker) -> FastAPI:
+    # the resolvers and strawberry's FastAPI integration are only imported once they're needed
+    from ..routers.graphql_router import create_graphql_router  # pylint: disable=import-outside-toplevel
+
+    graphql_app = FastAPI()
+    graphql_app.include_router(create_graphql_router(session_maker), prefix=settings.GRAPHQL_ENDPOINT)
+    return graphql_app
+
+
+class DeferredGraphQL:
+    """An ASGI app serving GraphQL that builds the schema on its first request rather than at startup."""
+
+    def __init__(self, session_maker):
+        self._session_maker = session_maker
+        self._app: FastAPI | None = None
+
+    def build(self) -> FastAPI:
+        if self._app is None:
+            self._app = create_graphql_app(self._session_maker)
+        return self._app
+
+    async def __call__(self, scope, receive, send):
+        await self.build()(scope, receive, send)
+
+
+def warm_up(app: FastAPI, full: bool = False):
+    """Load what the first requests would otherwise wait for.
+
+    Called at Lambda init. That's still part of the cold start, so it only loads the
+    corpus index. ``full`` also builds the GraphQL schema and AWS clients, for a
+    SnapStart snapshot where init time doesn't count.
+    """
+    load_corpus()
+    if full:
+        deferred = getattr(app.state, "graphql", None)
+        if deferred is not None:
+            deferred.build()
+        get_sns()
+        get_ses()
+
+
+def get_lifespan(engine: AsyncEngine):
     @asynccontextmanager
     async def lifespan(_app: FastAPI):
         # await async_create_tables(engine)
+        load_corpus()  # build the length index before the first request needs it
         yield
+        await engine.dispose()  # close pooled connections on shutdown
+        password_hasher.shutdown()
 
     return lifespan
 
@@ -42,13 +89,22 @@ def create_app(engine=None, async_sessionmaker=None):
         allow_headers=["*"],
     )
 
-    app.include_router(create_graphql_router(async_sessionmaker), prefix=settings.GRAPHQL_ENDPOINT)
+    if settings.startup_optimized:
+        app.state.graphql = DeferredGraphQL(async_sessionmaker)
+        app.router.add_route(settings.GRAPHQL_ENDPOINT, app.state.graphql, methods=["GET", "POST"])
+    else:
+        from ..routers.graphql_router import create_graphql_router  # pylint: disable=import-outside-toplevel
+        app.include_router(create_graphql_router(async_sessionmaker), prefix=settings.GRAPHQL_ENDPOINT)
     app.include_router(text_router)
     app.include_router(auth_router)
 
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy(_request: Request, exc: PasswordHasherBusy):
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
     @app.get("/health")
     def health():
-        return {"status": "ok"}
+        return {"status": "ok", "password_hashing": password_hasher.stats()}
 
     @app.post("/waitlist", response_model=None)
     async def join_waitlist(payload: WaitlistRequestPayload):
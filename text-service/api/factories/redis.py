@@ -0,0 +1,14 @@
+from functools import lru_cache
+
+from redis.asyncio import Redis
+
+from api.settings import settings
+
+
+@lru_cache()
+def get_redis() -> Redis | None:
+    """Shared asyncio Redis client, or ``None`` when ``REDIS_URL`` isn't configured."""
+    if not settings.REDIS_URL:
+        return None
+
+    return Redis.from_url(settings.REDIS_URL)
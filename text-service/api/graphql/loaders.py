@@ -0,0 +1,65 @@
+from collections import defaultdict
+from typing import Callable, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import lazyload
+from strawberry.dataloader import DataLoader
+
+from ..models.digraph_model import Digraph
+from ..models.unigraph_model import Unigraph
+from ..models.user_stats_summary_model import UserStatsSummary
+
+
+class Loaders:
+    """Per-request DataLoaders; each batches the keys requested in one tick into a single ``IN (...)`` query."""
+
+    def __init__(self, db_factory: Callable):
+        self.db_factory = db_factory
+
+        self.summary_by_user = DataLoader(load_fn=self.load_summaries)
+        self.unigraph_by_id = DataLoader(load_fn=self.load_unigraphs)
+        self.unigraphs_by_summary = DataLoader(load_fn=self.load_summary_unigraphs)
+        self.digraphs_by_summary = DataLoader(load_fn=self.load_summary_digraphs)
+
+    async def load_summaries(self, user_ids: Sequence[UUID]) -> list[UserStatsSummary | None]:
+        async with self.db_factory() as db:
+            result = await db.execute(
+                select(UserStatsSummary)
+                # n-grams are loaded separately, and only if the query selects them
+                .options(
+                    lazyload(UserStatsSummary.unigraphs),
+                    lazyload(UserStatsSummary.digraphs),
+                    lazyload(UserStatsSummary.user),
+                )
+                .where(UserStatsSummary.user_id.in_(user_ids))
+            )
+            summaries = {summary.user_id: summary for summary in result.scalars()}
+
+        return [summaries.get(user_id) for user_id in user_ids]
+
+    async def load_unigraphs(self, ids: Sequence[UUID]) -> list[Unigraph | None]:
+        async with self.db_factory() as db:
+            result = await db.execute(select(Unigraph).where(Unigraph.id.in_(ids)))
+            unigraphs = {unigraph.id: unigraph for unigraph in result.scalars()}
+
+        return [unigraphs.get(unigraph_id) for unigraph_id in ids]
+
+    async def load_summary_unigraphs(self, summary_ids: Sequence[UUID]) -> list[list[Unigraph]]:
+        return await self._load_by_summary(Unigraph, summary_ids)
+
+    async def load_summary_digraphs(self, summary_ids: Sequence[UUID]) -> list[list[Digraph]]:
+        return await self._load_by_summary(Digraph, summary_ids)
+
+    async def _load_by_summary(self, model, summary_ids: Sequence[UUID]) -> list[list]:
+        async with self.db_factory() as db:
+            result = await db.execute(
+                select(model)
+                .where(model.user_stats_summary_id.in_(summary_ids))
+                .order_by(model.key)
+            )
+            grouped = defaultdict(list)
+            for row in result.scalars():
+                grouped[row.user_stats_summary_id].append(row)
+
+        return [grouped[summary_id] for summary_id in summary_ids]
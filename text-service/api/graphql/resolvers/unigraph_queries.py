@@ -1,7 +1,7 @@
+from uuid import UUID
+
 import strawberry
-from sqlalchemy import select
 
-from ...models.unigraph_model import Unigraph
 from ..types.unigraph_type import UnigraphType
 
 
@@ -13,15 +13,18 @@ class UnigraphQuery:
         info: strawberry.types.Info,
         id: strawberry.ID = strawberry.argument(description="Unigraph ID"),
     ) -> UnigraphType | None:
-        db_factory = info.context["db_factory"]
-        async with db_factory() as db:
-            result = await db.execute(select(Unigraph).where(Unigraph.id == id))
-            uni = result.scalar_one_or_none()
-            if not uni:
-                return None
-            return UnigraphType(
-                id=uni.id,
-                key=uni.key,
-                count=uni.count,
-                accuracy=uni.accuracy,
-            )
+        try:
+            # the loader's results are keyed by UUID, and an ID arrives as a string
+            unigraph_id = UUID(id)
+        except ValueError:
+            return None
+
+        uni = await info.context["loaders"].unigraph_by_id.load(unigraph_id)
+        if not uni:
+            return None
+        return UnigraphType(
+            id=uni.id,
+            key=uni.key,
+            count=uni.count,
+            accuracy=uni.accuracy,
+        )
@@ -1,16 +1,12 @@
 from typing import Optional
-from passlib.context import CryptContext
 import strawberry
 from graphql import GraphQLError
 from pydantic import ValidationError
-from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import selectinload
 from strawberry.types import Info
 
-from ..types.digraph_type import DigraphType
-from ..types.unigraph_type import UnigraphType
 from ...auth.helpers import auth_required, normalise_user_stats_input
+from ...auth.security import password_hasher
 from ...controllers.user_stats_summary_controller import get_user_stats_summary_by_user_id, update_user_stats_summary
 from ...controllers.users_controller import create_user, update_user, delete_user
 from ...controllers.user_stats_session_controller import create_user_stats_session
@@ -21,11 +17,10 @@ from ...schemas.user_graphql import UserType, UserCreateInput
 from ...schemas.user_schema import UserCreate, UserUpdate
 from ..types.user_stats_session_type import UserStatsSessionType, UserStatsSessionInput
 from ...schemas.user_stats_session_schema import UserStatsSessionCreate
+from ...services.difficulty_cache import difficulty_cache
 from ...graphql.types.user_stats_summary_type import UserStatsSummaryType, UserStatsSummaryUpdateInput, \
     UserStatsSummaryCreateInput
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 @strawberry.type
 class UsersMutation:
@@ -33,7 +28,7 @@ class UsersMutation:
     async def create_user(self, info: Info, user_input: UserCreateInput) -> UserType:
         async with info.context["db_factory"]() as db:
             # Hash the incoming plaintext password
-            hashed_password = pwd_context.hash(user_input.password)
+            hashed_password = await password_hasher.hash(user_input.password)
 
             # Convert Strawberry input to dict, add hashed password
             user_data = user_input.__dict__.copy()
@@ -60,12 +55,15 @@ class UsersMutation:
     async def update_user(
         self,
         info: Info,
-        user_name: str
+        user_name: Optional[str] = None,
+        timezone: Optional[str] = None,
     ) -> UserType | None:
         try:
             user_id = info.context["user"].id
             async with info.context["db_factory"]() as db:
-                user_update = UserUpdate(user_name=user_name)
+                # only the arguments given are changed
+                changes = {"user_name": user_name, "timezone": timezone}
+                user_update = UserUpdate(**{field: value for field, value in changes.items() if value is not None})
                 user: UserType = await update_user(user_update, user_id, db)
                 # noinspection PyUnreachableCode
                 return UserType(
@@ -74,6 +72,7 @@ class UsersMutation:
                     first_name=user.first_name,
                     last_name=user.last_name,
                     email=user.email,
+                    timezone=user.timezone,
                 ) if user else None
 
         except ValidationError as e:
@@ -283,36 +282,11 @@ class UsersMutation:
 
                 await db.flush()
                 await db.commit()
+                await difficulty_cache.invalidate(user_id)
 
-                # Reload with eager loading
-                result = await db.execute(
-                    select(UserStatsSummary)
-                    .options(
-                        selectinload(UserStatsSummary.unigraphs),
-                        selectinload(UserStatsSummary.digraphs),
-                    )
-                    .filter(UserStatsSummary.id == summary.id)
-                )
-
-                summary = result.scalar_one()
-
-                # Build response types to avoid lazy loading later
-                unigraphs = [
-                    UnigraphType(
-                        id=u.id,
-                        key=u.key,
-                        count=u.count,
-                        accuracy=u.accuracy
-                    )
-                    for u in summary.unigraphs
-                ]
-
-                digraphs = [
-                    DigraphType(id=d.id, key=d.key, count=d.count, accuracy=d.accuracy, mean_interval=d.mean_interval)
-                    for d in summary.digraphs
-                ]
-
+                # n-gram fields are fetched by the loaders if the client selected them
                 return UserStatsSummaryType(
+                    id=summary.id,
                     user_id=summary.user_id,
                     total_sessions=summary.total_sessions,
                     total_practice_duration=summary.total_practice_duration,
@@ -334,9 +308,6 @@ class UsersMutation:
                     total_keystrokes=summary.total_keystrokes,
                     total_char_count=summary.total_char_count,
                     error_char_count=summary.error_char_count,
-
-                    unigraphs=unigraphs,
-                    digraphs=digraphs,
                 )
 
         except ValidationError as e:
@@ -368,6 +339,7 @@ class UsersMutation:
                 # noinspection PyUnreachableCode
                 if updated:
                     return UserStatsSummaryType(
+                        id=updated.id,
                         user_id=updated.user_id,
                         total_sessions=updated.total_sessions,
                         total_practice_duration=updated.total_practice_duration,
@@ -388,9 +360,6 @@ class UsersMutation:
                         total_keystrokes=updated.total_keystrokes,
                         total_char_count=updated.total_char_count,
                         error_char_count=updated.error_char_count,
-
-                        unigraphs=updated.unigraphs,
-                        digraphs=updated.digraphs
                     )
 
                 return None
@@ -1,23 +1,24 @@
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 import strawberry
+from graphql import GraphQLError
 from strawberry.types import Info
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
 from ...controllers.users_controller import get_all_users
-from ...controllers.user_stats_session_controller import get_all_user_stats_sessions, get_user_stats_session_by_id, \
-    get_user_stats_sessions_by_date_range
+from ...controllers.user_daily_stats_controller import get_user_daily_stats
+from ...controllers.user_stats_summary_controller import current_practice_streak
+from ...controllers.user_stats_session_controller import get_user_stats_session_by_id, \
+    get_user_stats_sessions_by_date_range, stream_user_stats_sessions
 from ...models.user_model import User
-from ...models.user_stats_summary_model import UserStatsSummary
 from ...schemas.user_graphql import UserType
 from ...graphql.types.user_stats_summary_type import UserStatsSummaryType
-from ..types.user_stats_session_type import UserStatsSessionType
-from ..types.digraph_type import DigraphType
-from ..types.unigraph_type import UnigraphType
-from ...utils.helpers import to_timestamp
+from ..types.user_daily_stats_type import StatsGranularity, UserDailyStatsType
+from ..types.user_stats_session_type import PageInfo, UserStatsSessionConnection, UserStatsSessionEdge, \
+    UserStatsSessionType
+from ...settings import settings
+from ...utils.helpers import decode_cursor, encode_cursor, to_timestamp
 
 
 @strawberry.type
@@ -33,7 +34,8 @@ class UsersQuery:
                     user_name=user.user_name,
                     first_name=user.first_name,
                     last_name=user.last_name,
-                    email=user.email
+                    email=user.email,
+                    timezone=user.timezone,
                 )
                 for user in users
             ]
@@ -50,13 +52,20 @@ class UsersQuery:
                 first_name=user.first_name,
                 last_name=user.last_name,
                 email=user.email,
+                timezone=user.timezone,
             ) if user else None
 
-    @strawberry.field(name="userStatsSessions")
+    @strawberry.field(
+        name="userStatsSessions",
+        deprecation_reason="Returns only the latest MAX_SESSION_PAGE_SIZE sessions; page with userStatsSessionHistory",
+    )
     async def user_stats_sessions(self, info: Info) -> list[UserStatsSessionType]:
+        user = info.context.get("user")
+        if not user:
+            return []
+
         async_session_maker = info.context["db_factory"]
         async with async_session_maker() as db:
-            sessions = await get_all_user_stats_sessions(db)
             return [
                 UserStatsSessionType(
                     id=s.id,
@@ -73,7 +82,7 @@ class UsersQuery:
                     total_keystrokes=s.total_keystrokes,
                     error_char_count=s.error_char_count
                 )
-                for s in sessions
+                async for s in stream_user_stats_sessions(user.id, db, limit=settings.MAX_SESSION_PAGE_SIZE)
             ]
 
     @strawberry.field()
@@ -117,7 +126,7 @@ class UsersQuery:
                 # raise GraphQLError("User not authenticated")
                 return None
 
-            sessions = await get_user_stats_sessions_by_date_range(user.id, start_date, end_date, db)
+            # rows are converted as they stream in rather than buffered first
             return [
                 UserStatsSessionType(
                     id=s.id,
@@ -135,68 +144,117 @@ class UsersQuery:
                     total_keystrokes=s.total_keystrokes,
                     error_char_count=s.error_char_count,
                 )
-                for s in sessions
+                async for s in get_user_stats_sessions_by_date_range(user.id, start_date, end_date, db)
             ]
 
-    @strawberry.field(name="userStatsSummary")
-    async def user_stats_summary(self, info: Info) -> Optional[UserStatsSummaryType]:
-        user_id = info.context["user"].id
-        async_session_maker = info.context["db_factory"]
-        async with async_session_maker() as db:
-            result = await db.execute(
-                select(UserStatsSummary)
-                .options(
-                    selectinload(UserStatsSummary.unigraphs),
-                    selectinload(UserStatsSummary.digraphs),
+    @strawberry.field(name="userStatsSessionHistory")
+    async def user_stats_session_history(
+            self,
+            info: Info,
+            first: int = settings.SESSION_PAGE_SIZE,
+            after: Optional[str] = None,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None,
+    ) -> Optional[UserStatsSessionConnection]:
+        user = info.context.get("user")
+        if not user:
+            return None
+
+        first = max(1, min(first, settings.MAX_SESSION_PAGE_SIZE))
+        try:
+            position = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise GraphQLError("Invalid cursor") from e
+
+        async with info.context["db_factory"]() as db:
+            # one extra row tells us whether there's another page without counting
+            edges = [
+                UserStatsSessionEdge(
+                    cursor=encode_cursor(s.start_time, s.id),
+                    node=UserStatsSessionType(
+                        id=s.id,
+                        user_id=s.user_id,
+                        wpm=s.wpm,
+                        net_wpm=s.net_wpm,
+                        accuracy=s.accuracy,
+                        raw_accuracy=s.raw_accuracy,
+                        practice_duration=s.practice_duration,
+                        start_time=to_timestamp(s.start_time),
+                        end_time=to_timestamp(s.end_time),
+                        corrected_char_count=s.corrected_char_count,
+                        deleted_char_count=s.deleted_char_count,
+                        total_char_count=s.total_char_count,
+                        total_keystrokes=s.total_keystrokes,
+                        error_char_count=s.error_char_count,
+                    ),
                 )
-                .filter(UserStatsSummary.user_id == user_id)
-            )
-            summary = result.scalar_one_or_none()
-            if not summary:
-                return None
+                async for s in stream_user_stats_sessions(user.id, db, first + 1, position, start_date, end_date)
+            ]
+
+        page = edges[:first]
+        return UserStatsSessionConnection(
+            edges=page,
+            page_info=PageInfo(has_next_page=len(edges) > first, end_cursor=page[-1].cursor if page else None),
+        )
+
+    @strawberry.field(name="userDailyStats")
+    async def user_daily_stats(
+            self,
+            info: Info,
+            start_date: date,
+            end_date: date,
+            granularity: StatsGranularity = StatsGranularity.DAY,
+    ) -> Optional[List[UserDailyStatsType]]:
+        user = info.context.get("user")
+        if not user:
+            return None
 
-            return UserStatsSummaryType(
-                user_id=summary.user_id,
-
-                average_accuracy=summary.average_accuracy,
-                average_raw_accuracy=summary.average_raw_accuracy,
-
-                fastest_wpm=summary.fastest_wpm,
-                average_wpm=summary.average_wpm,
-
-                average_net_wpm=summary.average_net_wpm,
-                fastest_net_wpm=summary.fastest_net_wpm,
-
-                total_practice_duration=summary.total_practice_duration,
-
-                total_sessions=summary.total_sessions,
-                practice_streak=summary.practice_streak,
-                longest_streak=summary.longest_streak,
-
-                total_corrected_char_count=summary.total_corrected_char_count,
-                total_deleted_char_count=summary.total_deleted_char_count,
-                total_keystrokes=summary.total_keystrokes,
-                total_char_count=summary.total_char_count,
-                error_char_count=summary.error_char_count,
-
-                unigraphs=[
-                    UnigraphType(
-                        id=uni.id,
-                        key=uni.key,
-                        count=uni.count,
-                        accuracy=uni.accuracy
-                    )
-                    for uni in summary.unigraphs
-                ],
-
-                digraphs=[
-                    DigraphType(
-                        id=di.id,
-                        key=di.key,
-                        mean_interval=di.mean_interval,
-                        accuracy=di.accuracy,
-                        count=di.count
-                    )
-                    for di in summary.digraphs
-                ]
+        async with info.context["db_factory"]() as db:
+            rows = await get_user_daily_stats(user.id, start_date, end_date, granularity.value, db)
+
+        return [
+            UserDailyStatsType(
+                period_start=row.period,
+                sessions=row.sessions,
+                practice_duration=row.practice_duration,
+                average_wpm=round(row.total_wpm / row.sessions, 1),
+                average_net_wpm=round(row.total_net_wpm / row.sessions, 1),
+                fastest_wpm=row.fastest_wpm,
+                average_accuracy=round(row.total_accuracy / row.sessions, 1),
+                average_raw_accuracy=round(row.total_raw_accuracy / row.sessions, 1),
             )
+            for row in rows
+        ]
+
+    @strawberry.field(name="userStatsSummary")
+    async def user_stats_summary(self, info: Info) -> Optional[UserStatsSummaryType]:
+        user = info.context["user"]
+        summary = await info.context["loaders"].summary_by_user.load(user.id)
+        if not summary:
+            return None
+
+        return UserStatsSummaryType(
+            id=summary.id,
+            user_id=summary.user_id,
+
+            average_accuracy=summary.average_accuracy,
+            average_raw_accuracy=summary.average_raw_accuracy,
+
+            fastest_wpm=summary.fastest_wpm,
+            average_wpm=summary.average_wpm,
+
+            average_net_wpm=summary.average_net_wpm,
+            fastest_net_wpm=summary.fastest_net_wpm,
+
+            total_practice_duration=summary.total_practice_duration,
+
+            total_sessions=summary.total_sessions,
+            practice_streak=current_practice_streak(summary, user.timezone),
+            longest_streak=summary.longest_streak,
+
+            total_corrected_char_count=summary.total_corrected_char_count,
+            total_deleted_char_count=summary.total_deleted_char_count,
+            total_keystrokes=summary.total_keystrokes,
+            total_char_count=summary.total_char_count,
+            error_char_count=summary.error_char_count,
+        )
@@ -0,0 +1,25 @@
+from datetime import date
+from enum import Enum
+
+import strawberry
+
+
+@strawberry.enum
+class StatsGranularity(Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+@strawberry.type
+class UserDailyStatsType:
+    period_start: date = strawberry.field(name="periodStart")
+    sessions: int
+    practice_duration: int = strawberry.field(name="practiceDuration")
+
+    average_wpm: float = strawberry.field(name="averageWpm")
+    average_net_wpm: float = strawberry.field(name="averageNetWpm")
+    fastest_wpm: int = strawberry.field(name="fastestWpm")
+
+    average_accuracy: float = strawberry.field(name="averageAccuracy")
+    average_raw_accuracy: float = strawberry.field(name="averageRawAccuracy")
@@ -29,6 +29,24 @@ class UserStatsSessionType:
     error_char_count: Optional[int] = strawberry.field(name="errorCharCount", default=None)
 
 
+@strawberry.type
+class PageInfo:
+    has_next_page: bool = strawberry.field(name="hasNextPage")
+    end_cursor: Optional[str] = strawberry.field(name="endCursor", default=None)
+
+
+@strawberry.type
+class UserStatsSessionEdge:
+    cursor: str
+    node: UserStatsSessionType
+
+
+@strawberry.type
+class UserStatsSessionConnection:
+    edges: list[UserStatsSessionEdge]
+    page_info: PageInfo = strawberry.field(name="pageInfo")
+
+
 @strawberry.input
 class UserStatsSessionInput:
     wpm: Optional[int] = None
@@ -2,6 +2,7 @@ from uuid import UUID
 from typing import Optional
 
 import strawberry
+from strawberry.types import Info
 
 from .digraph_type import DigraphInput, DigraphType
 from .unigraph_type import UnigraphType, UnigraphInput
@@ -64,6 +65,7 @@ class UserStatsSummaryUpdateInput:
 
 @strawberry.type
 class UserStatsSummaryType:
+    id: strawberry.Private[UUID]
     user_id: UUID = strawberry.field(name="userId")
     total_sessions: int = strawberry.field(name="totalSessions")
     total_practice_duration: int = strawberry.field(name="totalPracticeDuration")
@@ -91,5 +93,19 @@ class UserStatsSummaryType:
     total_char_count: int = strawberry.field(name="totalCharCount")
     error_char_count: int = strawberry.field(name="errorCharCount")
 
-    unigraphs: list[UnigraphType] = strawberry.field(name="unigraphs")
-    digraphs: list[DigraphType] = strawberry.field(name="digraphs")
+    # resolved through the request's loaders, so they're only queried when selected
+    @strawberry.field(name="unigraphs")
+    async def unigraphs(self, info: Info) -> list[UnigraphType]:
+        unigraphs = await info.context["loaders"].unigraphs_by_summary.load(self.id)
+        return [
+            UnigraphType(id=uni.id, key=uni.key, count=uni.count, accuracy=uni.accuracy)
+            for uni in unigraphs
+        ]
+
+    @strawberry.field(name="digraphs")
+    async def digraphs(self, info: Info) -> list[DigraphType]:
+        digraphs = await info.context["loaders"].digraphs_by_summary.load(self.id)
+        return [
+            DigraphType(id=di.id, key=di.key, count=di.count, accuracy=di.accuracy, mean_interval=di.mean_interval)
+            for di in digraphs
+        ]
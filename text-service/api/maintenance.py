@@ -0,0 +1,21 @@
+import asyncio
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .factories.database import async_sessionmaker_instance
+from .services.session_partitions import maintain_session_partitions
+
+
+# Scheduled from template.yml, so the coming months' session partitions are created
+# whether or not the Redis worker (which also does this) is deployed.
+
+async def maintain_partitions(session_maker: async_sessionmaker[AsyncSession] = async_sessionmaker_instance) -> bool:
+    async with session_maker() as db:
+        maintained = await maintain_session_partitions(db)
+        await db.commit()
+    return maintained
+
+
+def partitions_handler(_event: dict, _context=None) -> Any:
+    return {"maintained": asyncio.run(maintain_partitions())}
@@ -0,0 +1,53 @@
+"""rebucket user_daily_stats by user timezone
+
+Revision ID: 0b6d5e2f9a41
+Revises: f3a9c1d7e0b2
+Create Date: 2026-10-18 17:22:03.881640
+
+Rollups were keyed by UTC date; they're rebuilt from session history so each
+day is the user's local day, the same one their practice streak counts.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6d5e2f9a41'
+down_revision: Union[str, None] = 'f3a9c1d7e0b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def rebuild(day: str) -> None:
+    op.execute("DELETE FROM user_daily_stats")
+    op.execute(f"""
+        INSERT INTO user_daily_stats (
+            user_id, day, sessions, practice_duration, total_wpm, total_net_wpm, fastest_wpm,
+            total_accuracy, total_raw_accuracy
+        )
+        SELECT
+            s.user_id,
+            {day},
+            count(*),
+            coalesce(sum(s.practice_duration), 0),
+            coalesce(sum(s.wpm), 0),
+            coalesce(sum(s.net_wpm), 0),
+            coalesce(max(s.wpm), 0),
+            coalesce(sum(s.accuracy), 0),
+            coalesce(sum(s.raw_accuracy), 0)
+        FROM user_stats_sessions s
+        JOIN users u ON u.id = s.user_id
+        GROUP BY 1, 2
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rebuild("(s.start_time AT TIME ZONE u.timezone)::date")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    rebuild("(s.start_time AT TIME ZONE 'UTC')::date")
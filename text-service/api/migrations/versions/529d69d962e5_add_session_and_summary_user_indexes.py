@@ -0,0 +1,50 @@
+"""add session and summary user indexes
+
+Revision ID: 529d69d962e5
+Revises: 0ac305c41ae2
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '529d69d962e5'
+down_revision: Union[str, None] = '0ac305c41ae2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keep the summary with the most sessions for any user that raced into two
+    op.execute(sa.text("""
+        CREATE TEMPORARY TABLE duplicate_summaries ON COMMIT DROP AS
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id ORDER BY total_sessions DESC, id
+            ) AS rank
+            FROM user_stats_summaries
+        ) ranked
+        WHERE rank > 1
+    """))
+    op.execute(sa.text("DELETE FROM unigraphs WHERE user_stats_summary_id IN (SELECT id FROM duplicate_summaries)"))
+    op.execute(sa.text("DELETE FROM digraphs WHERE user_stats_summary_id IN (SELECT id FROM duplicate_summaries)"))
+    op.execute(sa.text("DELETE FROM user_stats_summaries WHERE id IN (SELECT id FROM duplicate_summaries)"))
+
+    op.create_unique_constraint('uq_user_stats_summaries_user_id', 'user_stats_summaries', ['user_id'])
+    op.create_index(
+        'ix_user_stats_sessions_user_id_start_time',
+        'user_stats_sessions',
+        ['user_id', 'start_time', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_stats_sessions_user_id_start_time', table_name='user_stats_sessions')
+    op.drop_constraint('uq_user_stats_summaries_user_id', 'user_stats_summaries', type_='unique')
@@ -0,0 +1,125 @@
+"""partition user_stats_sessions by month
+
+Revision ID: 6e814ee44ae6
+Revises: 529d69d962e5
+Create Date: 2026-10-18 11:02:17.540931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e814ee44ae6'
+down_revision: Union[str, None] = '529d69d962e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, user_id, wpm, net_wpm, accuracy, raw_accuracy, practice_duration, start_time, end_time, "
+    "corrected_char_count, deleted_char_count, total_char_count, total_keystrokes, error_char_count"
+)
+
+# matches SESSION_PARTITION_MONTHS_AHEAD; the worker takes over creating partitions from here
+MONTHS_AHEAD = 3
+
+
+def session_columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('wpm', sa.Integer(), nullable=True),
+        sa.Column('net_wpm', sa.Integer(), nullable=True),
+        sa.Column('accuracy', sa.Float(), nullable=True),
+        sa.Column('raw_accuracy', sa.Float(), nullable=True),
+        sa.Column('practice_duration', sa.Integer(), nullable=True),
+        sa.Column('start_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('corrected_char_count', sa.Integer(), nullable=True),
+        sa.Column('deleted_char_count', sa.Integer(), nullable=True),
+        sa.Column('total_char_count', sa.Integer(), nullable=True),
+        sa.Column('total_keystrokes', sa.Integer(), nullable=True),
+        sa.Column('error_char_count', sa.Integer(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_user_stats_sessions_user_id_start_time', table_name='user_stats_sessions')
+    op.execute(
+        "ALTER TABLE user_stats_sessions RENAME CONSTRAINT user_stats_sessions_pkey TO user_stats_sessions_old_pkey"
+    )
+    op.rename_table('user_stats_sessions', 'user_stats_sessions_old')
+
+    op.create_table(
+        'user_stats_sessions',
+        *session_columns(),
+        sa.PrimaryKeyConstraint('id', 'start_time'),
+        postgresql_partition_by='RANGE (start_time)',
+    )
+    op.execute("CREATE TABLE user_stats_sessions_default PARTITION OF user_stats_sessions DEFAULT")
+
+    # one partition per month from the oldest session up to MONTHS_AHEAD from now, bounded at midnight UTC
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN SELECT generate_series(
+                date_trunc('month', coalesce(
+                    (SELECT min(start_time) FROM user_stats_sessions_old), now()
+                ) AT TIME ZONE 'UTC'),
+                date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months',
+                interval '1 month'
+            )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF user_stats_sessions FOR VALUES FROM (%L) TO (%L)',
+                    'user_stats_sessions_' || to_char(month, 'YYYY_MM'),
+                    month AT TIME ZONE 'UTC',
+                    (month + interval '1 month') AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END $$
+    """)
+
+    # sessions recorded before start_time had a default can have none; end_time is the closest stand-in
+    op.execute(f"""
+        INSERT INTO user_stats_sessions ({COLUMNS})
+        SELECT {COLUMNS.replace('start_time', 'coalesce(start_time, end_time, now())')}
+        FROM user_stats_sessions_old
+    """)
+    op.drop_table('user_stats_sessions_old')
+
+    op.create_index(
+        'ix_user_stats_sessions_user_id_start_time',
+        'user_stats_sessions',
+        ['user_id', 'start_time', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table(
+        'user_stats_sessions_unpartitioned',
+        *session_columns(),
+        sa.PrimaryKeyConstraint('id', name='user_stats_sessions_unpartitioned_pkey'),
+    )
+    # archived partitions are left in the archive schema
+    op.execute(f"INSERT INTO user_stats_sessions_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM user_stats_sessions")
+    op.drop_table('user_stats_sessions')
+
+    op.rename_table('user_stats_sessions_unpartitioned', 'user_stats_sessions')
+    op.execute(
+        "ALTER TABLE user_stats_sessions RENAME CONSTRAINT user_stats_sessions_unpartitioned_pkey "
+        "TO user_stats_sessions_pkey"
+    )
+    op.create_index(
+        'ix_user_stats_sessions_user_id_start_time',
+        'user_stats_sessions',
+        ['user_id', 'start_time', 'id'],
+        unique=False,
+    )
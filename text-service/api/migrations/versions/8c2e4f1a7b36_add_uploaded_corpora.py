@@ -0,0 +1,36 @@
+"""add uploaded_corpora
+
+Revision ID: 8c2e4f1a7b36
+Revises: 0b6d5e2f9a41
+Create Date: 2026-10-18 18:05:12.417093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e4f1a7b36'
+down_revision: Union[str, None] = '0b6d5e2f9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'uploaded_corpora',
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('words', postgresql.ARRAY(sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'name'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('uploaded_corpora')
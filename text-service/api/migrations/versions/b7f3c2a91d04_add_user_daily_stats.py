@@ -0,0 +1,60 @@
+"""add user_daily_stats
+
+Revision ID: b7f3c2a91d04
+Revises: 6e814ee44ae6
+Create Date: 2026-10-18 12:24:51.803116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3c2a91d04'
+down_revision: Union[str, None] = '6e814ee44ae6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_daily_stats',
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('sessions', sa.Integer(), nullable=False),
+        sa.Column('practice_duration', sa.Integer(), nullable=False),
+        sa.Column('total_wpm', sa.Integer(), nullable=False),
+        sa.Column('total_net_wpm', sa.Integer(), nullable=False),
+        sa.Column('fastest_wpm', sa.Integer(), nullable=False),
+        sa.Column('total_accuracy', sa.Float(), nullable=False),
+        sa.Column('total_raw_accuracy', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'day'),
+    )
+
+    # from here on the ingest path keeps these up to date
+    op.execute("""
+        INSERT INTO user_daily_stats (
+            user_id, day, sessions, practice_duration, total_wpm, total_net_wpm, fastest_wpm,
+            total_accuracy, total_raw_accuracy
+        )
+        SELECT
+            user_id,
+            (start_time AT TIME ZONE 'UTC')::date,
+            count(*),
+            coalesce(sum(practice_duration), 0),
+            coalesce(sum(wpm), 0),
+            coalesce(sum(net_wpm), 0),
+            coalesce(max(wpm), 0),
+            coalesce(sum(accuracy), 0),
+            coalesce(sum(raw_accuracy), 0)
+        FROM user_stats_sessions
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_stats')
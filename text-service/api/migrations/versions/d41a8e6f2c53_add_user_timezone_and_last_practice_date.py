@@ -0,0 +1,32 @@
+"""add user timezone and last practice date
+
+Revision ID: d41a8e6f2c53
+Revises: b7f3c2a91d04
+Create Date: 2026-10-18 13:40:09.127455
+
+Streaks for existing summaries are filled in by ``python -m api.services.streak_backfill``.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a8e6f2c53'
+down_revision: Union[str, None] = 'b7f3c2a91d04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('timezone', sa.String(), server_default='UTC', nullable=False))
+    op.add_column('user_stats_summaries', sa.Column('last_practice_date', sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_stats_summaries', 'last_practice_date')
+    op.drop_column('users', 'timezone')
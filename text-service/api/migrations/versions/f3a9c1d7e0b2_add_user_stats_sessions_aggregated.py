@@ -0,0 +1,35 @@
+"""add user_stats_sessions aggregated
+
+Revision ID: f3a9c1d7e0b2
+Revises: d41a8e6f2c53
+Create Date: 2026-10-18 16:05:41.503219
+
+Every existing session has already been folded into its summary, so they're
+added as aggregated; new ones default to not.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c1d7e0b2'
+down_revision: Union[str, None] = 'd41a8e6f2c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'user_stats_sessions',
+        sa.Column('aggregated', sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+    op.alter_column('user_stats_sessions', 'aggregated', server_default=sa.false())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_stats_sessions', 'aggregated')
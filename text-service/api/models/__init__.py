@@ -10,3 +10,17 @@ class WaitlistRequest(Base):
     email = Column(String(255), nullable=False, unique=True)
     # pylint: disable=not-callable
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# every model is registered as soon as any one of them is imported, so relationships
+# declared by name resolve and create_all sees every table, whichever module came first
+# pylint: disable=wrong-import-position,unused-import
+from . import (  # noqa: E402,F401
+    digraph_model,
+    unigraph_model,
+    uploaded_corpus_model,
+    user_daily_stats_model,
+    user_model,
+    user_stats_session_model,
+    user_stats_summary_model,
+)
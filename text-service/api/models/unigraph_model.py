@@ -5,7 +5,6 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.mutable import MutableDict
 
 from ..factories.database import Base
-from ..graphql.types.user_stats_summary_type import UserStatsSummaryType
 
 
 class Unigraph(Base):
@@ -27,4 +26,4 @@ class Unigraph(Base):
 
     mistyped = Column(MutableDict.as_mutable(JSONB), default=MutableDict)
 
-    summary: Mapped[UserStatsSummaryType] = relationship("UserStatsSummary", back_populates="unigraphs")
+    summary: Mapped["UserStatsSummary"] = relationship("UserStatsSummary", back_populates="unigraphs")
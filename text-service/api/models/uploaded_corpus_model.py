@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from ..factories.database import Base
+
+
+class UploadedCorpus(Base):
+    """A word list a user uploaded, kept so it survives eviction from the in-process corpus registry."""
+    __tablename__ = "uploaded_corpora"
+
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+
+    words: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False)
+    # pylint: disable=not-callable
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    user: Mapped["User"] = relationship("User", back_populates="uploaded_corpora")
@@ -0,0 +1,31 @@
+from datetime import date
+
+from sqlalchemy import Date, Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..factories.database import Base
+
+
+class UserDailyStats(Base):
+    """One row per user per UTC day they practised, kept up to date as sessions are aggregated.
+
+    Per-session metrics are stored as sums so days roll up into weeks and months
+    exactly; averages are taken when they're read.
+    """
+    __tablename__ = "user_daily_stats"
+
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    sessions: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    practice_duration: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    total_wpm: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_net_wpm: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fastest_wpm: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    total_accuracy: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    total_raw_accuracy: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+    user: Mapped["User"] = relationship("User", back_populates="daily_stats")
@@ -17,6 +17,8 @@ class User(Base):
     last_name: Mapped[Optional[str]] = mapped_column(index=True)
     email: Mapped[str] = mapped_column(unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
+    # IANA name; practice streaks count days in this zone
+    timezone: Mapped[str] = mapped_column(String, nullable=False, default="UTC", server_default="UTC")
 
     sessions: Mapped[list["UserStatsSession"]] = relationship(
         "UserStatsSession", back_populates="user", cascade="all, delete"
@@ -24,3 +26,9 @@ class User(Base):
     summary: Mapped[Optional["UserStatsSummary"]] = relationship(
         "UserStatsSummary", uselist=False, back_populates="user", cascade="all, delete"
     )
+    daily_stats: Mapped[list["UserDailyStats"]] = relationship(
+        "UserDailyStats", back_populates="user", cascade="all, delete"
+    )
+    uploaded_corpora: Mapped[list["UploadedCorpus"]] = relationship(
+        "UploadedCorpus", back_populates="user", cascade="all, delete"
+    )
@@ -2,18 +2,29 @@ from datetime import datetime
 from typing import Optional
 from uuid import uuid4
 
-from sqlalchemy import ForeignKey, Integer, Float, DateTime, func
+from sqlalchemy import (
+    DDL, Boolean, ForeignKey, Index, Integer, Float, DateTime, PrimaryKeyConstraint, event, false, func
+)
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..factories.database import Base
 
+# catches sessions outside every monthly partition; see services.session_partitions
+DEFAULT_PARTITION = "user_stats_sessions_default"
 
 
 class UserStatsSession(Base):
     __tablename__ = "user_stats_sessions"
+    __table_args__ = (
+        # the partition key has to be part of the primary key; rows are still identified by id alone
+        PrimaryKeyConstraint("id", "start_time"),
+        # history reads filter on user and time range, and page by (start_time, id)
+        Index("ix_user_stats_sessions_user_id_start_time", "user_id", "start_time", "id"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
 
-    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), default=uuid4)
     user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
 
     wpm: Mapped[Optional[int]] = mapped_column(Integer)
@@ -25,7 +36,7 @@ class UserStatsSession(Base):
     practice_duration: Mapped[Optional[int]] = mapped_column(Integer)
 
     start_time: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()  # pylint: disable=not-callable
+        DateTime(timezone=True), nullable=False, server_default=func.now()  # pylint: disable=not-callable
     )
     end_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
@@ -35,4 +46,16 @@ class UserStatsSession(Base):
     total_keystrokes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     error_char_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
+    # set in the transaction that folds the session into the summary, so a redelivered one is skipped
+    aggregated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+
     user: Mapped["User"] = relationship("User", back_populates="sessions")
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+event.listen(
+    UserStatsSession.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF user_stats_sessions DEFAULT"),
+)
@@ -1,7 +1,9 @@
+from datetime import date
+from typing import Optional
 from uuid import uuid4
 
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Integer, ForeignKey, Numeric
+from sqlalchemy import Date, Integer, ForeignKey, Numeric, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..factories.database import Base
@@ -9,6 +11,9 @@ from ..factories.database import Base
 
 class UserStatsSummary(Base):
     __tablename__ = "user_stats_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", name="uq_user_stats_summaries_user_id"),
+    )
 
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -24,6 +29,8 @@ class UserStatsSummary(Base):
 
     practice_streak: Mapped[int] = mapped_column(Integer, default=0)
     longest_streak: Mapped[int] = mapped_column(Integer, default=0)
+    # the most recent day practised, in the user's time zone
+    last_practice_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
 
     total_sessions: Mapped[int] = mapped_column(Integer, default=1)
     total_practice_duration: Mapped[int] = mapped_column(Integer, default=0)
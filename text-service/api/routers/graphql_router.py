@@ -1,39 +1,43 @@
 import strawberry
 from strawberry.fastapi import GraphQLRouter
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
 from jose import JWTError
 
+from ..graphql.loaders import Loaders
 from ..graphql.resolvers.user_mutations import UsersMutation
 from ..graphql.resolvers.user_queries import UsersQuery
 from ..graphql.resolvers.unigraph_queries import UnigraphQuery
-from ..models.user_model import User
-from ..auth.dependencies import get_token_credentials
-from ..factories.database import async_sessionmaker
+from ..auth.dependencies import get_token_credentials, load_user
+from ..factories.database import RequestSession, async_sessionmaker
 
 
 def create_graphql_router(session_maker: async_sessionmaker[AsyncSession]):
     async def get_context(request: Request):
-        user = None
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                user_id = get_token_credentials(token)
-                # Open a temporary DB session just to fetch the user
-                async with session_maker() as db:
-                    result = await db.execute(select(User).where(User.id == user_id))
-                    user = result.scalar_one_or_none()
-            except JWTError:
-                pass  # unauthenticated
+        # every resolver in the operation shares one session, opened on first use
+        db_factory = RequestSession(session_maker)
+        try:
+            user = None
+            auth_header = request.headers.get("Authorization")
+            if auth_header and auth_header.startswith("Bearer "):
+                token = auth_header.split(" ")[1]
+                try:
+                    user_id = get_token_credentials(token)
+                    # no connection is checked out unless the user isn't cached
+                    async with db_factory() as db:
+                        user = await load_user(user_id, db)
+                except JWTError:
+                    pass  # unauthenticated
 
-        # Return context without an open DB session here
-        return {
-            "db_factory": session_maker,
-            "request": request,
-            "user": user,
-        }
+            yield {
+                "db_factory": db_factory,
+                "loaders": Loaders(db_factory),
+                "request": request,
+                "user": user,
+            }
+        finally:
+            # runs as a FastAPI dependency, so this happens once the response is done
+            await db_factory.close()
 
     @strawberry.type
     class Query(UsersQuery, UnigraphQuery):
@@ -1,200 +1,202 @@
-from functools import lru_cache
-from pathlib import Path
-from random import shuffle, sample
-import string
+import json
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, Query  # Depends
-from pydantic import BaseModel
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import session, AsyncSession
-from sqlalchemy.orm import selectinload
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.auth.dependencies import get_current_user
+from api.controllers.uploaded_corpus_controller import get_uploaded_corpus_words, save_uploaded_corpus
 from api.factories.database import get_db
 from api.models.user_model import User
-from api.models.user_stats_summary_model import UserStatsSummary
+from api.services.corpus_service import DEFAULT_CORPUS, Corpus, corpus_registry
+from api.services.practice_streams import practice_streams
+from api.services.practice_text_service import get_user_difficulty, pick_passages, stream_words
 from api.settings import settings
 
 
 text_router = APIRouter(prefix="/text")
 
+MAX_UPLOADED_WORD_LENGTH = 32
+
+
 # --------------------
-# Canonical n-gram sets
+# Endpoint
 # --------------------
 
-ALL_UNIGRAPHS = list(string.ascii_lowercase)
-
-ALL_DIGRAPHS = (
-    [a + b for a in string.ascii_lowercase for b in string.ascii_lowercase]
-    + [" " + c for c in string.ascii_lowercase]
-    + [c + " " for c in string.ascii_lowercase]
-)
+class TextParams(BaseModel):
+    minlen: int | None = None
+    maxlen: int | None = None
+    corpus: str = DEFAULT_CORPUS
 
-DIFFICULTY_WEIGHT = 1.0
 
+class BatchTextParams(TextParams):
+    count: int = Field(1, ge=1, le=settings.MAX_PRACTICE_PASSAGES)
 
-# --------------------
-# Normalisation helpers
-# --------------------
 
-def normalise_unigraphs(user_unigraphs):
-    stats = {u.key: u for u in user_unigraphs}
-
-    merged = {}
-    for char in ALL_UNIGRAPHS:
-        if char in stats:
-            accuracy = stats[char].accuracy / 100.0
-            accuracy = min(max(accuracy, 0.0), 1.0)
-
-            merged[char] = {
-                "count": stats[char].count,
-                "accuracy": accuracy,
-                "seen": stats[char].count > 0,
-            }
-        else:
-            merged[char] = {
-                "count": 0,
-                "accuracy": 0.0,
-                "seen": False,
-            }
-    return merged
-
-
-
-def normalise_digraphs(user_digraphs):
-    stats = {d.key: d for d in user_digraphs}
-
-    merged = {}
-    for pair in ALL_DIGRAPHS:
-        if pair in stats:
-            accuracy = stats[pair].accuracy / 100.0
-            accuracy = min(max(accuracy, 0.0), 1.0)
-
-            merged[pair] = {
-                "count": stats[pair].count,
-                "accuracy": accuracy,
-                "seen": stats[pair].count > 0,
-            }
-        else:
-            merged[pair] = {
-                "count": 0,
-                "accuracy": 0.0,
-                "seen": False,
-            }
-    return merged
+class StreamTextParams(TextParams):
+    chunk_size: int = Field(20, ge=1, le=settings.WORD_LIMIT)
+    # always bounded: behind Mangum the response is buffered, so a disconnect is never seen
+    words: int = Field(settings.WORD_LIMIT, ge=1, le=settings.MAX_STREAM_WORDS)
 
 
-# --------------------
-# Scoring
-# --------------------
+class RollingAccuracy(BaseModel):
+    accuracy: dict[str, float]
 
-def score_word(word, uni_stats, di_stats):
-    score = 0.0
-    word = word.lower()
 
-    # unigraph contribution
-    for c in word:
-        stat = uni_stats.get(c)
-        if not stat:
-            continue
+class CorpusUpload(BaseModel):
+    name: str = Field(pattern=r"^[a-z0-9_-]{1,32}$")
+    words: list[str] = Field(min_length=1, max_length=settings.MAX_UPLOADED_WORDS)
 
-        difficulty = (1.0 - stat["accuracy"]) + (1.0 / (stat["count"] + 1))
-        score += difficulty * DIFFICULTY_WEIGHT
 
-    # digraph contribution (space padded)
-    padded = f" {word} "
-    for i in range(len(padded) - 1):
-        pair = padded[i:i + 2]
-        stat = di_stats.get(pair)
-        if not stat:
-            continue
+def uploaded_corpus_name(user: User, name: str) -> str:
+    return f"user:{user.id}:{name}"
 
-        difficulty = (1.0 - stat["accuracy"]) + (1.0 / (stat["count"] + 1))
-        score += difficulty * DIFFICULTY_WEIGHT
 
-    ngram_count = max(len(word), 1) + (len(word) + 1)
-    return score / ngram_count
+async def resolve_corpus(user: User, name: str, session: AsyncSession) -> Corpus:
+    """Built-in corpora by name, falling back to the user's own uploaded lists."""
+    if corpus_registry.is_registered(name):
+        return corpus_registry.get(name)
 
-# --------------------
-# Endpoint
-# --------------------
+    corpus = corpus_registry.get(uploaded_corpus_name(user, name))
+    if corpus is not None:
+        return corpus
 
-class TextParams(BaseModel):
-    minlen: int | None = None
-    maxlen: int | None = None
+    # evicted, or uploaded through another process
+    words = await get_uploaded_corpus_words(user.id, name, session)
+    if words is None:
+        raise HTTPException(status_code=404, detail="Corpus not found")
 
+    corpus = Corpus.from_words(words)
+    corpus_registry.add(uploaded_corpus_name(user, name), corpus)
+    return corpus
 
 
-@text_router.post("/generate-practice-text")
-async def generate_practice_text(
+async def practice_pool(
     params: TextParams,
-    current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db)
-):
+    current_user: User,
+    session: AsyncSession,
+) -> tuple[Corpus, range, np.ndarray | None]:
     min_len = params.minlen or 1
     max_len = params.maxlen or 20
     if min_len > max_len:
         raise ValueError("min_len cannot be greater than max_len")
 
-    word_list = load_word_list()
+    corpus = await resolve_corpus(current_user, params.corpus, session)
 
-    # filter corpus early
-    word_list = [
-        w for w in word_list
-        if min_len <= len(w) <= max_len
-    ]
+    # words are bucketed by length, so the window is a contiguous range
+    candidates = corpus.window(min_len, max_len)
+
+    # None for a new user, who gets a uniform sample instead
+    difficulty = await get_user_difficulty(current_user.id, session) if candidates else None
+
+    return corpus, candidates, difficulty
+
+
+async def generate_passages(
+    params: TextParams,
+    passages: int,
+    current_user: User,
+    session: AsyncSession,
+) -> list[str]:
+    corpus, candidates, difficulty = await practice_pool(params, current_user, session)
+    if not candidates:
+        return []
 
-    if not word_list:
-        return {"text": ""}
-
-    stmt = (
-        select(UserStatsSummary)
-        .where(UserStatsSummary.user_id == current_user.id)
-        .options(
-            selectinload(UserStatsSummary.unigraphs),
-            selectinload(UserStatsSummary.digraphs)
-        )
-    )
-
-    result = await session.execute(stmt)
-    summary = result.unique().scalars().one_or_none()
-
-    # new user fallback
-    if not summary:
-        sample_words = sample(word_list, settings.WORD_LIMIT)
-        shuffle(sample_words)  # <-- already shuffling, fine
-        return {"text": " ".join(sample_words)}
-
-    # existing user
-    uni_stats = normalise_unigraphs(summary.unigraphs)
-    di_stats = normalise_digraphs(summary.digraphs)
-
-    scored_words = [
-        (word, score_word(word, uni_stats, di_stats))
-        for word in word_list
+    return [
+        " ".join(words)
+        for words in pick_passages(corpus, candidates, difficulty, passages, settings.WORD_LIMIT)
     ]
 
-    scored_words.sort(key=lambda x: x[1], reverse=True)
 
-    selected_words = [w for w, _ in scored_words[:settings.WORD_LIMIT]]
+def encode_event(payload: dict, sse: bool) -> str:
+    data = json.dumps(payload)
+    return f"data: {data}\n\n" if sse else f"{data}\n"
 
-    # shuffle the selected words before sending
-    shuffle(selected_words)
 
-    return {"text": " ".join(selected_words)}
+@text_router.post("/generate-practice-text")
+async def generate_practice_text(
+    params: TextParams,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db)
+):
+    texts = await generate_passages(params, 1, current_user, session)
+    return {"text": texts[0] if texts else ""}
 
 
-# --------------------
-# Corpus loader
-# --------------------
+@text_router.post("/generate-practice-text/batch")
+async def generate_practice_text_batch(
+    params: BatchTextParams,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db)
+):
+    return {"texts": await generate_passages(params, params.count, current_user, session)}
 
-@lru_cache()
-def load_word_list():
-    root_path = Path(__file__).resolve().parent.parent.parent
-    word_file = root_path / "text.txt"
 
-    return [
-        line.strip()
-        for line in word_file.read_text(encoding="utf-8").splitlines()
-        if line.strip()
-    ]
+@text_router.post("/stream-practice-text")
+async def stream_practice_text(
+    params: StreamTextParams,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db)
+):
+    corpus, candidates, difficulty = await practice_pool(params, current_user, session)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    stream_id = uuid4()
+
+    async def events():
+        await practice_streams.open(stream_id, current_user.id)
+        try:
+            yield encode_event({"stream_id": str(stream_id)}, sse)
+            if not candidates:
+                return
+
+            chunks = stream_words(corpus, candidates, difficulty, params.chunk_size)
+            chunk = next(chunks)
+            remaining = params.words
+            while remaining > 0:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+                yield encode_event({"text": " ".join(chunk)}, sse)
+
+                # feedback posted while the last chunk was being read re-weights the next one
+                update = await practice_streams.take(stream_id)
+                chunk = chunks.send(update or None)
+        finally:
+            await practice_streams.close(stream_id)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+@text_router.post("/stream-practice-text/{stream_id}/accuracy", status_code=204)
+async def update_stream_accuracy(
+    stream_id: UUID,
+    payload: RollingAccuracy,
+    current_user: User = Depends(get_current_user),
+):
+    if not await practice_streams.post(stream_id, current_user.id, payload.accuracy):
+        raise HTTPException(status_code=404, detail="Stream not found")
+
+
+@text_router.post("/corpora")
+async def upload_corpus(
+    payload: CorpusUpload,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db)
+):
+    if corpus_registry.is_registered(payload.name):
+        raise HTTPException(status_code=400, detail="Corpus name is reserved")
+
+    words = [word.strip() for word in payload.words if word.strip() and len(word.strip()) <= MAX_UPLOADED_WORD_LENGTH]
+    if not words:
+        raise HTTPException(status_code=400, detail="No usable words in upload")
+
+    if not await save_uploaded_corpus(current_user.id, payload.name, words, settings.MAX_UPLOADED_CORPORA, session):
+        raise HTTPException(status_code=400, detail="Too many uploaded corpora")
+
+    # stored first, so an evicted list is reloaded from the database on its next use
+    corpus_registry.add(uploaded_corpus_name(current_user, payload.name), Corpus.from_words(words))
+    return {"name": payload.name, "words": len(words)}
@@ -2,12 +2,14 @@ from typing import Optional
 from uuid import UUID
 
 import strawberry
-from sqlalchemy import select
 from strawberry import Info
 
+from ..controllers.user_stats_session_controller import stream_user_stats_sessions
+from ..controllers.user_stats_summary_controller import current_practice_streak
 from ..graphql.types.user_stats_session_type import UserStatsSessionType
 from ..graphql.types.user_stats_summary_type import UserStatsSummaryType
-from ..models.user_stats_session_model import UserStatsSession
+from ..settings import settings
+from ..utils.helpers import to_timestamp
 
 
 @strawberry.input
@@ -27,27 +29,53 @@ class UserType:
     first_name: Optional[str] = strawberry.field(name="firstName")
     last_name: Optional[str] = strawberry.field(name="lastName")
     email: str
-
-    summary: Optional[UserStatsSummaryType] = None
+    timezone: str = "UTC"
 
     @strawberry.field()
-    async def sessions(self, info: Info) -> list[UserStatsSessionType]:
-        async_session = info.context["db_factory"]
-
-        async with async_session() as db:
-            result = await db.execute(
-                select(UserStatsSession).where(UserStatsSession.user_id == self.id)
-            )
-            sessions = result.scalars().all()
+    async def summary(self, info: Info) -> Optional[UserStatsSummaryType]:
+        # batched with any other users' summaries in the same query
+        summary = await info.context["loaders"].summary_by_user.load(self.id)
+        if not summary:
+            return None
+
+        return UserStatsSummaryType(
+            id=summary.id,
+            user_id=summary.user_id,
+            total_sessions=summary.total_sessions,
+            total_practice_duration=summary.total_practice_duration,
+            practice_streak=current_practice_streak(summary, self.timezone),
+            longest_streak=summary.longest_streak,
+            fastest_wpm=summary.fastest_wpm,
+            average_wpm=summary.average_wpm,
+            fastest_net_wpm=summary.fastest_net_wpm,
+            average_net_wpm=summary.average_net_wpm,
+            average_accuracy=summary.average_accuracy,
+            average_raw_accuracy=summary.average_raw_accuracy,
+            total_corrected_char_count=summary.total_corrected_char_count,
+            total_deleted_char_count=summary.total_deleted_char_count,
+            total_keystrokes=summary.total_keystrokes,
+            total_char_count=summary.total_char_count,
+            error_char_count=summary.error_char_count,
+        )
+
+    @strawberry.field(
+        deprecation_reason="Returns only the latest MAX_SESSION_PAGE_SIZE sessions; page with userStatsSessionHistory",
+    )
+    async def sessions(self, info: Info, first: int = settings.SESSION_PAGE_SIZE) -> list[UserStatsSessionType]:
+        first = max(1, min(first, settings.MAX_SESSION_PAGE_SIZE))
+
+        async with info.context["db_factory"]() as db:
             return [
                 UserStatsSessionType(
                     id=session.id,
                     user_id=session.user_id,
                     wpm=session.wpm,
+                    net_wpm=session.net_wpm,
                     accuracy=session.accuracy,
+                    raw_accuracy=session.raw_accuracy,
                     practice_duration=session.practice_duration,
-                    start_time=session.start_time,
-                    end_time=session.end_time,
+                    start_time=to_timestamp(session.start_time),
+                    end_time=to_timestamp(session.end_time),
                 )
-                for session in sessions
+                async for session in stream_user_stats_sessions(self.id, db, limit=first)
             ]
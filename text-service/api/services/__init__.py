@@ -1,6 +1,24 @@
-import boto3
+from functools import cache
 
 from api.settings import settings
 
-sns = boto3.client("sns", region_name=settings.REGION)
-ses = boto3.client("ses", region_name=settings.REGION)
+
+# boto3 takes a few hundred milliseconds to import and build clients, so neither
+# happens until a request needs one rather than on every cold start
+
+@cache
+def get_sns():
+    import boto3  # pylint: disable=import-outside-toplevel
+    return boto3.client("sns", region_name=settings.REGION)
+
+
+@cache
+def get_ses():
+    import boto3  # pylint: disable=import-outside-toplevel
+    return boto3.client("ses", region_name=settings.REGION)
+
+
+@cache
+def get_ssm():
+    import boto3  # pylint: disable=import-outside-toplevel
+    return boto3.client("ssm")
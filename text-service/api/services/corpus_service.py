@@ -0,0 +1,347 @@
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+import json
+import mmap
+import operator
+from pathlib import Path
+import string
+import sys
+
+import numpy as np
+
+from api.settings import settings
+from api.utils.logger import logger
+
+
+# --------------------
+# Canonical n-gram sets
+# --------------------
+
+ALL_UNIGRAPHS = list(string.ascii_lowercase)
+
+ALL_DIGRAPHS = (
+    [a + b for a in string.ascii_lowercase for b in string.ascii_lowercase]
+    + [" " + c for c in string.ascii_lowercase]
+    + [c + " " for c in string.ascii_lowercase]
+)
+
+# Feature space shared by the corpus and the per-user difficulty vectors:
+# unigraphs first, then digraphs, then one slot for n-grams we don't track.
+ALL_NGRAMS = ALL_UNIGRAPHS + ALL_DIGRAPHS
+NGRAM_INDEX = {ngram: i for i, ngram in enumerate(ALL_NGRAMS)}
+UNTRACKED_NGRAM = len(ALL_NGRAMS)
+FEATURE_COUNT = len(ALL_NGRAMS) + 1
+
+ROOT_PATH = Path(__file__).resolve().parent.parent.parent
+CORPUS_PATH = ROOT_PATH / "text.txt"
+
+DEFAULT_CORPUS = "english"
+
+CORPUS_SOURCES = {
+    "english": CORPUS_PATH,
+    "code": ROOT_PATH / "corpora" / "code.txt",
+}
+
+# wrappers cycled over the english list to build the punctuation corpus
+PUNCTUATION_PATTERNS = ("{},", "{}.", "({})", '"{}"', "{};", "{}:", "{}!", "{}?", "'{}'", "{}-")
+
+# Compiled corpus layout: magic, little-endian u32 header length, JSON header
+# describing each array, then the arrays themselves, each 64-byte aligned.
+CORPUS_MAGIC = b"TYPCORP1"
+CORPUS_ALIGNMENT = 64
+
+CORPUS_ARRAYS = {
+    "word_blob": np.dtype("<u1"),
+    "word_offsets": np.dtype("<i8"),
+    "lengths": np.dtype("<i4"),
+    "length_offsets": np.dtype("<i8"),
+    "ngram_ids": np.dtype("<i8"),
+    "offsets": np.dtype("<i8"),
+    "ngram_counts": np.dtype("<f8"),
+}
+
+
+# --------------------
+# Corpus
+# --------------------
+
+class WordTable(Sequence):
+    """Read-only sequence of words packed into a single UTF-8 blob.
+
+    Word ``i`` is ``blob[offsets[i]:offsets[i + 1]]``; it's only decoded when read.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        index = operator.index(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("word index out of range")
+
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+
+class Corpus:
+    """A word list with its n-gram features precomputed for vectorised scoring.
+
+    The words x features count matrix is stored in compressed-row form: the
+    feature ids of word ``i`` are ``ngram_ids[offsets[i]:offsets[i + 1]]``,
+    with a feature repeated once per occurrence. Every word has at least two
+    entries (its space-padded edge digraphs), so no row is ever empty.
+
+    Words are kept sorted by length, and ``length_offsets[n]`` is the index of
+    the first word at least ``n`` characters long, so any length window is a
+    contiguous range of rows.
+
+    Everything lives in flat arrays (see ``CORPUS_ARRAYS``), which is what lets
+    ``from_file`` hand back a corpus backed directly by a shared mmap.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.word_blob = arrays["word_blob"]
+        self.word_offsets = arrays["word_offsets"]
+        self.lengths = arrays["lengths"]
+        self.length_offsets = arrays["length_offsets"]
+        self.ngram_ids = arrays["ngram_ids"]
+        self.offsets = arrays["offsets"]
+        self.ngram_counts = arrays["ngram_counts"]
+
+        self.words = WordTable(self.word_blob, self.word_offsets)
+        self.max_length = len(self.length_offsets) - 2
+
+    @classmethod
+    def from_words(cls, words: list[str]) -> "Corpus":
+        # duplicates in the source list would let a batch repeat a word across passages
+        words = sorted(dict.fromkeys(words), key=len)
+        encoded = [word.encode("utf-8") for word in words]
+        lengths = np.fromiter((len(w) for w in words), dtype=np.int32, count=len(words))
+        max_length = int(lengths[-1]) if len(words) else 0
+
+        ngram_ids: list[int] = []
+        offsets = [0]
+        for word in words:
+            word = word.lower()
+            ngram_ids.extend(NGRAM_INDEX.get(c, UNTRACKED_NGRAM) for c in word)
+
+            padded = f" {word} "
+            ngram_ids.extend(
+                NGRAM_INDEX.get(padded[i:i + 2], UNTRACKED_NGRAM)
+                for i in range(len(padded) - 1)
+            )
+            offsets.append(len(ngram_ids))
+
+        return cls({
+            "word_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "word_offsets": np.concatenate(([0], np.cumsum([len(w) for w in encoded], dtype=np.int64))),
+            "lengths": lengths,
+            "length_offsets": np.searchsorted(lengths, np.arange(max_length + 2)),
+            "ngram_ids": np.array(ngram_ids, dtype=np.intp),
+            "offsets": np.array(offsets, dtype=np.intp),
+            # unigraphs + space-padded digraphs per word
+            "ngram_counts": (np.maximum(lengths, 1) + lengths + 1).astype(np.float64),
+        })
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Corpus":
+        """Map a compiled corpus read-only; its pages are shared by every process mapping it."""
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(CORPUS_MAGIC)] != CORPUS_MAGIC:
+            raise ValueError(f"{path} is not a compiled corpus")
+
+        header_start = len(CORPUS_MAGIC) + 4
+        header_length = int.from_bytes(buffer[len(CORPUS_MAGIC):header_start], "little")
+        header = json.loads(buffer[header_start:header_start + header_length])
+
+        return cls({
+            name: np.frombuffer(buffer, dtype=dtype, count=header[name]["count"], offset=header[name]["offset"])
+            for name, dtype in CORPUS_ARRAYS.items()
+        })
+
+    def save(self, path: Path) -> None:
+        arrays = {
+            name: np.ascontiguousarray(getattr(self, name), dtype=dtype)
+            for name, dtype in CORPUS_ARRAYS.items()
+        }
+
+        # the header records the offsets, so reserve room for the widest header first
+        header_room = len(json.dumps({name: {"count": 2 ** 62, "offset": 2 ** 62} for name in arrays}))
+        position = _align(len(CORPUS_MAGIC) + 4 + header_room)
+
+        header = {}
+        for name, array in arrays.items():
+            header[name] = {"count": len(array), "offset": position}
+            position = _align(position + array.nbytes)
+
+        encoded_header = json.dumps(header).encode("utf-8")
+        with open(path, "wb") as file:
+            file.write(CORPUS_MAGIC)
+            file.write(len(encoded_header).to_bytes(4, "little"))
+            file.write(encoded_header)
+            for name, array in arrays.items():
+                file.seek(header[name]["offset"])
+                file.write(array.tobytes())
+            file.truncate(position)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in CORPUS_ARRAYS)
+
+    def window(self, min_len: int, max_len: int) -> range:
+        """Indices of the words whose length falls in ``[min_len, max_len]``."""
+        bound = self.max_length + 1
+        start = self.length_offsets[min(max(min_len, 0), bound)]
+        stop = self.length_offsets[min(max(max_len + 1, 0), bound)]
+        return range(int(start), int(max(start, stop)))
+
+    def score(self, difficulty: np.ndarray, rows: range | None = None) -> np.ndarray:
+        """Mean n-gram difficulty of each word in ``rows``, given a ``FEATURE_COUNT`` vector.
+
+        Only the requested rows are touched; their slice of ``ngram_ids`` is a view.
+        """
+        if rows is None:
+            rows = range(len(self))
+        if not rows:
+            return np.empty(0, dtype=np.float64)
+
+        offsets = self.offsets[rows.start:rows.stop + 1]
+        ngram_ids = self.ngram_ids[offsets[0]:offsets[-1]]
+
+        totals = np.add.reduceat(difficulty[ngram_ids], offsets[:-1] - offsets[0])
+        return totals / self.ngram_counts[rows.start:rows.stop]
+
+
+def _align(position: int) -> int:
+    return -(-position // CORPUS_ALIGNMENT) * CORPUS_ALIGNMENT
+
+
+# --------------------
+# Corpus loaders
+# --------------------
+
+def read_word_list(path: Path = CORPUS_PATH) -> list[str]:
+    return [
+        line.strip()
+        for line in path.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+
+
+def compile_corpus(source: Path = CORPUS_PATH, target: Path | None = None) -> Corpus:
+    corpus = Corpus.from_words(read_word_list(source))
+    corpus.save(target or source.with_suffix(".bin"))
+    return corpus
+
+
+def is_compiled_corpus_current(source: Path = CORPUS_PATH, target: Path | None = None) -> bool:
+    target = target or source.with_suffix(".bin")
+    if not target.exists():
+        return False
+    return not source.exists() or target.stat().st_mtime >= source.stat().st_mtime
+
+
+def load_corpus_file(source: Path) -> Corpus:
+    """Map the compiled sibling of ``source`` if it's up to date, otherwise parse ``source``."""
+    compiled = source.with_suffix(".bin")
+    if is_compiled_corpus_current(source, compiled):
+        return Corpus.from_file(compiled)
+
+    # every process then holds its own parsed copy instead of sharing the mapped pages
+    logger.warning("No up-to-date %s, parsing %s instead", compiled.name, source.name)
+    return Corpus.from_words(read_word_list(source))
+
+
+def load_punctuation_corpus() -> Corpus:
+    words = read_word_list(CORPUS_PATH)
+    return Corpus.from_words([
+        PUNCTUATION_PATTERNS[i % len(PUNCTUATION_PATTERNS)].format(word)
+        for i, word in enumerate(words)
+    ])
+
+
+# --------------------
+# Registry
+# --------------------
+
+class CorpusRegistry:
+    """Named corpora, loaded on first use and kept within a memory budget.
+
+    Corpora registered with a loader are reloaded transparently after being
+    evicted. Corpora added directly (uploaded word lists) have no loader, so
+    once evicted they're gone until they are added again.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._loaders: dict[str, Callable[[], Corpus]] = {}
+        self._loaded: OrderedDict[str, Corpus] = OrderedDict()
+
+    def register(self, name: str, loader: Callable[[], Corpus]) -> None:
+        self._loaders[name] = loader
+        self._loaded.pop(name, None)
+
+    def add(self, name: str, corpus: Corpus) -> None:
+        self._loaded[name] = corpus
+        self._loaded.move_to_end(name)
+        self._evict()
+
+    def get(self, name: str) -> Corpus | None:
+        corpus = self._loaded.get(name)
+        if corpus is not None:
+            self._loaded.move_to_end(name)
+            return corpus
+
+        loader = self._loaders.get(name)
+        if loader is None:
+            return None
+
+        corpus = loader()
+        self.add(name, corpus)
+        return corpus
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._loaders
+
+    def _evict(self) -> None:
+        # the most recently used corpus always stays, even if it alone is over budget
+        while len(self._loaded) > 1 and sum(c.nbytes for c in self._loaded.values()) > self.max_bytes:
+            name, _ = self._loaded.popitem(last=False)
+            logger.info("Evicted corpus %s", name)
+
+
+corpus_registry = CorpusRegistry(settings.CORPUS_CACHE_BYTES)
+
+for _name, _source in CORPUS_SOURCES.items():
+    corpus_registry.register(_name, lambda source=_source: load_corpus_file(source))
+corpus_registry.register("punctuation", load_punctuation_corpus)
+
+
+def load_corpus(name: str = DEFAULT_CORPUS) -> Corpus | None:
+    return corpus_registry.get(name)
+
+
+if __name__ == "__main__":
+    # python -m api.services.corpus_service [source.txt [target.bin]]
+    # with no arguments every file-backed corpus is compiled next to its source
+    if len(sys.argv) > 1:
+        compile_corpus(*(Path(arg) for arg in sys.argv[1:3]))
+    else:
+        for _source in CORPUS_SOURCES.values():
+            compile_corpus(_source)
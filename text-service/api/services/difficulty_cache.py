@@ -0,0 +1,73 @@
+from time import time
+from uuid import UUID
+
+import numpy as np
+from redis.exceptions import RedisError
+
+from api.factories.redis import get_redis
+from api.settings import settings
+from api.utils.cache import ExpiringCache
+from api.utils.logger import logger
+
+
+class DifficultyCache:
+    """Per-user difficulty vectors, in Redis when it's configured and otherwise in an in-process LRU.
+
+    With Redis there's no local tier, so an invalidation from any process (the
+    session worker included) is seen by every other one on its next read.
+    Without Redis sessions are aggregated in the process that received them,
+    which invalidates its own LRU; entries expire after ``ttl`` seconds either way.
+    """
+
+    KEY_PREFIX = "difficulty:"
+
+    def __init__(self, max_size: int, ttl: int):
+        self.ttl = ttl
+        self._entries: ExpiringCache[np.ndarray] = ExpiringCache(max_size)
+
+    async def get(self, user_id: UUID) -> np.ndarray | None:
+        redis = get_redis()
+        if redis is None:
+            return self._entries.get(user_id)
+
+        try:
+            raw = await redis.get(f"{self.KEY_PREFIX}{user_id}")
+        except RedisError:
+            logger.warning("Difficulty cache lookup failed for %s", user_id, exc_info=True)
+            return None
+
+        if raw is None:
+            return None
+        # read-only, like a locally cached vector
+        return np.frombuffer(raw, dtype=np.float64)
+
+    async def set(self, user_id: UUID, vector: np.ndarray) -> None:
+        vector.flags.writeable = False
+
+        redis = get_redis()
+        if redis is None:
+            self._entries.set(user_id, vector, time() + self.ttl)
+            return
+
+        try:
+            await redis.set(f"{self.KEY_PREFIX}{user_id}", vector.astype(np.float64).tobytes(), ex=self.ttl)
+        except RedisError:
+            logger.warning("Difficulty cache write failed for %s", user_id, exc_info=True)
+
+    async def invalidate(self, user_id: UUID) -> None:
+        self._entries.invalidate(user_id)
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        try:
+            await redis.delete(f"{self.KEY_PREFIX}{user_id}")
+        except RedisError:
+            logger.warning("Difficulty cache invalidation failed for %s", user_id, exc_info=True)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+difficulty_cache = DifficultyCache(settings.DIFFICULTY_CACHE_SIZE, settings.DIFFICULTY_CACHE_TTL)
@@ -0,0 +1,101 @@
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from api.factories.redis import get_redis
+from api.settings import settings
+from api.utils.logger import logger
+
+
+class PracticeStreams:
+    """Rolling accuracy posted to open practice streams, waiting for the stream's next chunk.
+
+    Kept in Redis when it's configured, so feedback can reach a stream whichever
+    process or Lambda instance it's posted to; otherwise only in this process.
+    """
+
+    KEY_PREFIX = "practice-stream:"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        # stream id -> (owner, accuracy posted since the last chunk), without Redis
+        self._streams: dict[UUID, tuple[UUID, dict[str, float]]] = {}
+
+    def _owner_key(self, stream_id: UUID) -> str:
+        return f"{self.KEY_PREFIX}{stream_id}"
+
+    def _accuracy_key(self, stream_id: UUID) -> str:
+        return f"{self.KEY_PREFIX}{stream_id}:accuracy"
+
+    async def open(self, stream_id: UUID, user_id: UUID) -> None:
+        redis = get_redis()
+        if redis is None:
+            self._streams[stream_id] = (user_id, {})
+            return
+
+        try:
+            # expires on its own should the stream's process die before closing it
+            await redis.set(self._owner_key(stream_id), str(user_id), ex=self.ttl)
+        except RedisError:
+            logger.warning("Could not open practice stream %s", stream_id, exc_info=True)
+
+    async def post(self, stream_id: UUID, user_id: UUID, accuracy: dict[str, float]) -> bool:
+        """Queue ``accuracy`` for the stream's next chunk; False if the user has no such open stream."""
+        redis = get_redis()
+        if redis is None:
+            stream = self._streams.get(stream_id)
+            if stream is None or stream[0] != user_id:
+                return False
+            stream[1].update(accuracy)
+            return True
+
+        try:
+            owner = await redis.get(self._owner_key(stream_id))
+            if owner is None or owner.decode() != str(user_id):
+                return False
+            if accuracy:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.hset(self._accuracy_key(stream_id), mapping=accuracy)
+                    pipe.expire(self._accuracy_key(stream_id), self.ttl)
+                    await pipe.execute()
+        except RedisError:
+            logger.warning("Could not post accuracy to practice stream %s", stream_id, exc_info=True)
+            return False
+        return True
+
+    async def take(self, stream_id: UUID) -> dict[str, float]:
+        """The accuracy posted since the last call, which is then cleared."""
+        redis = get_redis()
+        if redis is None:
+            stream = self._streams.get(stream_id)
+            if stream is None:
+                return {}
+            update = dict(stream[1])
+            stream[1].clear()
+            return update
+
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hgetall(self._accuracy_key(stream_id))
+                pipe.delete(self._accuracy_key(stream_id))
+                pipe.expire(self._owner_key(stream_id), self.ttl)
+                update, _, _ = await pipe.execute()
+        except RedisError:
+            logger.warning("Could not read accuracy for practice stream %s", stream_id, exc_info=True)
+            return {}
+        return {key.decode(): float(value) for key, value in update.items()}
+
+    async def close(self, stream_id: UUID) -> None:
+        self._streams.pop(stream_id, None)
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        try:
+            await redis.delete(self._owner_key(stream_id), self._accuracy_key(stream_id))
+        except RedisError:
+            logger.warning("Could not close practice stream %s", stream_id, exc_info=True)
+
+
+practice_streams = PracticeStreams(settings.PRACTICE_STREAM_TTL)
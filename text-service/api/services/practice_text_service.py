@@ -0,0 +1,172 @@
+from typing import Generator, Iterable
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from .corpus_service import ALL_NGRAMS, FEATURE_COUNT, NGRAM_INDEX, Corpus
+from .difficulty_cache import difficulty_cache
+from ..models.user_stats_summary_model import UserStatsSummary
+
+DIFFICULTY_WEIGHT = 1.0
+
+# (1 - accuracy) + 1 / (count + 1) for an n-gram the user has never typed
+UNSEEN_DIFFICULTY = 2.0
+
+# how far one rolling-accuracy update moves a key's difficulty mid-stream
+ROLLING_ACCURACY_WEIGHT = 0.5
+
+_rng = np.random.default_rng()
+
+
+# --------------------
+# Difficulty vectors
+# --------------------
+
+def difficulty_vector(unigraphs: Iterable, digraphs: Iterable) -> np.ndarray:
+    """Per-feature difficulty for a user, laid out like ``corpus_service.ALL_NGRAMS``.
+
+    Accepts the user's ``Unigraph``/``Digraph`` rows. N-grams the user has no row
+    for count as unseen; the trailing untracked slot is always zero so words with
+    characters outside the canonical sets aren't penalised for them.
+    """
+    difficulty = np.full(FEATURE_COUNT, UNSEEN_DIFFICULTY, dtype=np.float64)
+    difficulty[len(ALL_NGRAMS):] = 0.0
+
+    for stat in (*unigraphs, *digraphs):
+        index = NGRAM_INDEX.get(stat.key)
+        if index is None:
+            continue
+
+        accuracy = min(max(stat.accuracy / 100.0, 0.0), 1.0)
+        difficulty[index] = (1.0 - accuracy) + (1.0 / (stat.count + 1))
+
+    return difficulty * DIFFICULTY_WEIGHT
+
+
+async def get_user_difficulty(user_id: UUID, db: AsyncSession) -> np.ndarray | None:
+    """The user's difficulty vector, or ``None`` if they have no stats summary yet."""
+    cached = await difficulty_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(
+        select(UserStatsSummary)
+        .where(UserStatsSummary.user_id == user_id)
+        .options(
+            selectinload(UserStatsSummary.unigraphs),
+            selectinload(UserStatsSummary.digraphs)
+        )
+    )
+    summary = result.unique().scalars().one_or_none()
+    if not summary:
+        return None
+
+    difficulty = difficulty_vector(summary.unigraphs, summary.digraphs)
+    await difficulty_cache.set(user_id, difficulty)
+    return difficulty
+
+
+def reweight(difficulty: np.ndarray, rolling: dict[str, float]) -> np.ndarray:
+    """Blend rolling per-key accuracy (0-100) from the current session into ``difficulty``."""
+    difficulty = difficulty.copy()
+    for key, accuracy in rolling.items():
+        index = NGRAM_INDEX.get(key)
+        if index is None:
+            continue
+
+        recent = 1.0 - min(max(accuracy / 100.0, 0.0), 1.0)
+        difficulty[index] += ROLLING_ACCURACY_WEIGHT * (recent - difficulty[index])
+
+    return difficulty
+
+
+# --------------------
+# Selection
+# --------------------
+
+def select_top_k(scores: np.ndarray, k: int, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Indices of the ``k`` highest scores, highest first, without sorting all of them.
+
+    Words tied on the cut-off score are taken in index order so the result is
+    deterministic; pass ``rng`` to pick among the tied words at random instead.
+    """
+    if k <= 0 or not scores.size:
+        return np.empty(0, dtype=np.intp)
+
+    if k < scores.size:
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)
+        if rng is not None:
+            tied = rng.permutation(tied)
+        chosen = np.concatenate((above, tied[:k - above.size]))
+    else:
+        chosen = np.arange(scores.size)
+
+    # only the k survivors get sorted
+    return chosen[np.lexsort((chosen, -scores[chosen]))]
+
+
+def pick_passages(
+    corpus: Corpus,
+    candidates: range,
+    difficulty: np.ndarray | None,
+    passages: int,
+    words_per_passage: int,
+) -> list[list[str]]:
+    """Split one scoring pass over ``candidates`` into passages that share no words.
+
+    Without a difficulty vector (new users) words are sampled uniformly. The
+    selected pool is shuffled before splitting so every passage gets a mix of
+    the hardest words rather than the first passage taking all of them.
+    """
+    total = min(passages * words_per_passage, len(candidates))
+
+    if difficulty is None:
+        picked = _rng.choice(len(candidates), size=total, replace=False)
+    else:
+        # ties are broken at random too, so users with the same stats don't all get the same text
+        picked = select_top_k(corpus.score(difficulty, candidates), total, _rng)
+        _rng.shuffle(picked)
+
+    return [
+        [corpus.words[candidates.start + i] for i in chunk]
+        for chunk in np.array_split(picked, passages)
+        if chunk.size
+    ]
+
+
+def stream_words(
+    corpus: Corpus,
+    candidates: range,
+    difficulty: np.ndarray | None,
+    chunk_size: int,
+) -> Generator[list[str], dict[str, float] | None, None]:
+    """Endless chunks of practice words from ``candidates``, hardest first.
+
+    No word repeats until the whole window has been served. Sending the
+    generator a dict of rolling per-key accuracy re-weights every chunk after it.
+    """
+    if difficulty is None:
+        # every score ties at zero, so chunks are uniform samples until feedback arrives
+        difficulty = np.zeros(FEATURE_COUNT, dtype=np.float64)
+
+    scores = corpus.score(difficulty, candidates)
+    served = np.zeros(len(candidates), dtype=bool)
+
+    while True:
+        available = np.flatnonzero(~served)
+        if not available.size:
+            served[:] = False
+            available = np.arange(len(candidates))
+
+        picked = available[select_top_k(scores[available], chunk_size, _rng)]
+        served[picked] = True
+
+        rolling = yield [corpus.words[candidates.start + i] for i in _rng.permutation(picked)]
+        if rolling:
+            difficulty = reweight(difficulty, rolling)
+            scores = corpus.score(difficulty, candidates)
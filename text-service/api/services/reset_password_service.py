@@ -1,6 +1,6 @@
 import asyncio
 
-from api.services import ses
+from api.services import get_ses
 
 
 RESET_EMAIL_TEXT = """
@@ -21,6 +21,8 @@ The Typation Team
 async def send_reset_email(email: str, token: str):
     reset_link = f"https://typation.co.uk/auth/reset-password/{token}"
 
+    # the first call also builds the client, so that happens off the event loop too
+    ses = await asyncio.to_thread(get_ses)
     await asyncio.to_thread(
         ses.send_email,
         Source="contact@typation.co.uk",
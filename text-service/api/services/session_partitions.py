@@ -0,0 +1,139 @@
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models.user_stats_session_model import DEFAULT_PARTITION, UserStatsSession
+from api.settings import settings
+from api.utils.logger import logger
+
+PARENT = UserStatsSession.__tablename__
+PARTITION_PATTERN = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+
+# any constant works; it only has to be the same for every process maintaining partitions
+MAINTENANCE_LOCK = 0x5e55_1075
+
+
+# --------------------
+# Months
+# --------------------
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+def month_bound(month: date) -> str:
+    """A partition bound literal for midnight UTC on ``month``."""
+    return f"'{datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()}'"
+
+
+# --------------------
+# Partitions
+# --------------------
+
+async def list_session_partitions(db: AsyncSession) -> dict[date, str]:
+    """The monthly partitions currently attached, by the month they hold."""
+    result = await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        f"WHERE i.inhparent = '{PARENT}'::regclass"
+    ))
+
+    partitions = {}
+    for (name,) in result:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+async def create_session_partition(db: AsyncSession, month: date):
+    """Attach a partition for ``month``, moving in any of its sessions that landed in the default partition."""
+    name = partition_name(month)
+    lower, upper = month_bound(month), month_bound(add_months(month, 1))
+
+    # a partition can't be created over rows the default partition holds for its range,
+    # so it's built detached, filled from the default partition and then attached
+    await db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE start_time >= {lower} AND start_time < {upper} "
+        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+    ))
+    await db.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})"))
+
+
+async def create_session_partitions(db: AsyncSession, first: date, last: date) -> list[str]:
+    """Make sure every month from ``first`` to ``last`` inclusive has a partition; returns the ones created."""
+    existing = await list_session_partitions(db)
+
+    created = []
+    month = month_start(first)
+    while month <= last:
+        if month not in existing:
+            await create_session_partition(db, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+async def archive_session_partitions(db: AsyncSession, before: date) -> list[str]:
+    """Detach the partitions of months before ``before`` into the archive schema; returns the ones moved.
+
+    Archived sessions are out of history reads but are kept as plain tables until
+    they're exported or dropped. Their summaries already include them.
+    """
+    schema = settings.SESSION_ARCHIVE_SCHEMA
+    partitions = await list_session_partitions(db)
+
+    archived = []
+    for month, name in sorted(partitions.items()):
+        if month >= month_start(before):
+            break
+
+        await db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+        await db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        # the copied user foreign key would stop users with archived sessions from being deleted
+        foreign_keys = await db.scalars(text(
+            f"SELECT conname FROM pg_constraint WHERE conrelid = '{name}'::regclass AND contype = 'f'"
+        ))
+        for constraint in foreign_keys.all():
+            await db.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+        await db.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+        archived.append(f"{schema}.{name}")
+    return archived
+
+
+async def maintain_session_partitions(db: AsyncSession, today: date | None = None) -> bool:
+    """Create the coming months' partitions and archive expired ones; False if another process is already at it.
+
+    Runs in the caller's transaction, which has to be committed.
+    """
+    locked = await db.scalar(text(f"SELECT pg_try_advisory_xact_lock({MAINTENANCE_LOCK})"))
+    if not locked:
+        return False
+
+    current = month_start(today or datetime.now(timezone.utc).date())
+
+    created = await create_session_partitions(
+        db, current, add_months(current, settings.SESSION_PARTITION_MONTHS_AHEAD)
+    )
+    if created:
+        logger.info(f"Created session partitions {', '.join(created)}")
+
+    if settings.SESSION_ARCHIVE_AFTER_MONTHS is not None:
+        archived = await archive_session_partitions(
+            db, add_months(current, -settings.SESSION_ARCHIVE_AFTER_MONTHS)
+        )
+        if archived:
+            logger.info(f"Archived session partitions {', '.join(archived)}")
+
+    return True
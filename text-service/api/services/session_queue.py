@@ -0,0 +1,41 @@
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from api.factories.redis import get_redis
+from api.schemas.user_stats_session_schema import UserStatsSessionCreate
+from api.settings import settings
+from api.utils.logger import logger
+
+
+def session_queue_enabled() -> bool:
+    return get_redis() is not None
+
+
+async def publish_session(user_id: UUID, session_id: UUID, data: UserStatsSessionCreate) -> bool:
+    """Queue a session's summary and n-gram aggregation for the worker; False if it couldn't be queued."""
+    redis = get_redis()
+    if redis is None:
+        return False
+
+    message = {"user_id": str(user_id), "session_id": str(session_id), "session": data.model_dump_json()}
+    try:
+        await redis.xadd(settings.SESSION_STREAM, message, maxlen=settings.SESSION_STREAM_MAXLEN, approximate=True)
+    except RedisError as e:
+        logger.warning(f"Could not queue session for {user_id}: {e}")
+        return False
+
+    return True
+
+
+def decode_session(fields: dict[bytes, bytes]) -> tuple[UUID, UUID | None, UserStatsSessionCreate]:
+    """The inverse of ``publish_session`` for one stream entry's fields.
+
+    The session id is ``None`` for entries queued before it was part of the message.
+    """
+    session_id = fields.get(b"session_id")
+    return (
+        UUID(fields[b"user_id"].decode()),
+        UUID(session_id.decode()) if session_id else None,
+        UserStatsSessionCreate.model_validate_json(fields[b"session"]),
+    )
@@ -0,0 +1,66 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.factories.database import async_sessionmaker_instance
+from api.utils.logger import logger
+
+# runs of consecutive practice days ("islands") are found by subtracting each day's rank from it,
+# which is constant within a run; the current streak is the run ending on the last day practised,
+# as long as that was today or yesterday in the user's time zone
+BACKFILL_STREAKS = text("""
+    WITH days AS (
+        SELECT DISTINCT s.user_id, u.timezone, (s.start_time AT TIME ZONE u.timezone)::date AS day
+        FROM user_stats_sessions s
+        JOIN users u ON u.id = s.user_id
+    ),
+    runs AS (
+        SELECT user_id, timezone, count(*) AS length, max(day) AS last_day
+        FROM (
+            SELECT user_id, timezone, day, day - (row_number() OVER (PARTITION BY user_id ORDER BY day))::int AS island
+            FROM days
+        ) islands
+        GROUP BY user_id, timezone, island
+    ),
+    streaks AS (
+        SELECT
+            user_id,
+            CASE
+                WHEN max(last_day) >= (now() AT TIME ZONE timezone)::date - 1
+                THEN (array_agg(length ORDER BY last_day DESC))[1]
+                ELSE 0
+            END AS current,
+            max(length) AS longest,
+            max(last_day) AS last_day
+        FROM runs
+        GROUP BY user_id, timezone
+    )
+    UPDATE user_stats_summaries summary
+    SET practice_streak = streaks.current,
+        longest_streak = streaks.longest,
+        last_practice_date = streaks.last_day
+    FROM streaks
+    WHERE summary.user_id = streaks.user_id
+""")
+
+
+async def backfill_practice_streaks(db: AsyncSession) -> int:
+    """Recompute every summary's streaks from session history in one statement; returns the summaries updated.
+
+    Ingest keeps streaks current from then on. The caller commits.
+    """
+    result = await db.execute(BACKFILL_STREAKS)
+    return result.rowcount
+
+
+async def main():
+    async with async_sessionmaker_instance() as db:
+        updated = await backfill_practice_streaks(db)
+        await db.commit()
+    logger.info(f"Backfilled practice streaks for {updated} summaries")
+
+
+if __name__ == "__main__":
+    # python -m api.services.streak_backfill
+    asyncio.run(main())
@@ -1,11 +1,12 @@
 from typing import Optional
 from uuid import UUID
 
-from passlib.hash import bcrypt
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from api.auth.cache import user_cache
+from api.auth.security import password_hasher
 from api.controllers.users_controller import get_user_by_id
 from api.models.user_model import User
 
@@ -20,7 +21,8 @@ async def update_user_password(user_id: UUID, new_password: str, db: AsyncSessio
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.hashed_password = bcrypt.hash(new_password)
+    user.hashed_password = await password_hasher.hash(new_password)
     await db.commit()
+    user_cache.invalidate(user.id)
     await db.refresh(user)
     return user
@@ -1,12 +1,12 @@
 import asyncio
-import boto3
+
 from pydantic import EmailStr
 from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
 
 from api.factories.database import async_sessionmaker_instance
 from api.models import WaitlistRequest
-from api.services import ses, sns
+from api.services import get_ses, get_sns, get_ssm
 from api.settings import settings
 
 WELCOME_EMAIL_TEXT = (
@@ -21,8 +21,7 @@ WELCOME_EMAIL_TEXT = (
 )
 
 def get_secret(name: str) -> str:
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameter(Name=name, WithDecryption=True)
+    response = get_ssm().get_parameter(Name=name, WithDecryption=True)
     return response["Parameter"]["Value"]
 
 
@@ -37,6 +36,8 @@ async def add_to_waitlist(email: EmailStr):
             await session.rollback()
             return False  # already on waitlist
 
+    # the first call also builds the client, so that happens off the event loop too
+    sns = await asyncio.to_thread(get_sns)
     await asyncio.to_thread(
         sns.publish,
         TopicArn=settings.SNS_TOPIC_ARN,
@@ -44,6 +45,7 @@ async def add_to_waitlist(email: EmailStr):
         Message=f"New signup: {email}"
     )
 
+    ses = await asyncio.to_thread(get_ses)
     await asyncio.to_thread(
         ses.send_email,
         Source="contact@typation.co.uk",
@@ -1,11 +1,22 @@
 import os
 from functools import cached_property
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = None
+    # "queue" keeps a connection pool, "null" connects per session and "pgbouncer" is
+    # "null" without server-side prepared statements; unset picks "null" on Lambda, else "queue"
+    DB_POOL_MODE: Literal["queue", "null", "pgbouncer"] | None = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # builds the GraphQL schema on its first request and warms up at init; unset turns it on for Lambda
+    STARTUP_OPTIMIZED: bool | None = None
     PYTHONPATH: str = "./"
     GRAPHQL_ENDPOINT: str = "/graphql"
 
@@ -18,8 +29,37 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     # TODO: reduce to 60 and implement refresh tokens
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200
+    # verified tokens are cached until they expire; users for USER_CACHE_TTL seconds
+    TOKEN_CACHE_SIZE: int = 10_000
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: int = 60
+    # bcrypt runs on its own threads; calls beyond MAX_PENDING are turned away with a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
 
     WORD_LIMIT: int = 200
+    MAX_PRACTICE_PASSAGES: int = 10
+    CORPUS_CACHE_BYTES: int = 64 * 1024 * 1024
+    MAX_STREAM_WORDS: int = 2_000
+    # how long an open practice stream's state outlives its last chunk in Redis
+    PRACTICE_STREAM_TTL: int = 600
+    MAX_UPLOADED_WORDS: int = 10_000
+    MAX_UPLOADED_CORPORA: int = 10  # per user
+    DIFFICULTY_CACHE_SIZE: int = 10_000
+    DIFFICULTY_CACHE_TTL: int = 300
+
+    SESSION_PAGE_SIZE: int = 50
+    MAX_SESSION_PAGE_SIZE: int = 200
+    # user_stats_sessions is partitioned by month; scheduled maintenance keeps this many months ahead created
+    SESSION_PARTITION_MONTHS_AHEAD: int = 3
+    # months of history kept attached before a partition moves to the archive schema; None keeps everything
+    SESSION_ARCHIVE_AFTER_MONTHS: int | None = None
+    SESSION_ARCHIVE_SCHEMA: str = "archive"
+
+    REDIS_URL: str | None = None
+    # sessions are aggregated by the worker when Redis is configured
+    SESSION_STREAM: str = "user-stats-sessions"
+    SESSION_STREAM_MAXLEN: int = 100_000
 
     REGION: str = "eu-west-2"
     SNS_TOPIC_ARN: str = "arn:aws:sns:eu-west-2:343647980472:waitlist-signups"
@@ -30,6 +70,19 @@ class Settings(BaseSettings):
     def database_url(self) -> str:
         return self.DATABASE_URL  # Optional: parse or fallback if needed
 
+    @property
+    def db_pool_mode(self) -> str:
+        if self.DB_POOL_MODE:
+            return self.DB_POOL_MODE
+        # a frozen Lambda can't return connections to a pool, so don't keep any
+        return "null" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "queue"
+
+    @property
+    def startup_optimized(self) -> bool:
+        if self.STARTUP_OPTIMIZED is not None:
+            return self.STARTUP_OPTIMIZED
+        return bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
     @property
     def is_test(self) -> bool:
         return os.getenv("ENV", "dev") == "test"
@@ -1,4 +1,6 @@
+import base64
 from datetime import datetime
+from uuid import UUID
 
 
 def get_unigraph_weights(unigraphs: list) -> dict[str, float]:
@@ -31,3 +33,16 @@ def score_word(word: str, unigraph_weights: dict[str, float], digraph_weights: d
 
 def to_timestamp(dt: datetime) -> float:
     return dt.timestamp() if dt else 0.0
+
+
+def encode_cursor(start_time: datetime, session_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{start_time.isoformat()}|{session_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """The ``(start_time, id)`` keyset position in a cursor; raises ``ValueError`` if it's malformed."""
+    try:
+        start_time, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return datetime.fromisoformat(start_time), UUID(session_id)
@@ -0,0 +1,506 @@
+"""Load tests for the hot endpoints.
+
+    python -m benchmarks.load --database-url URL [--redis-url URL] [--users 50] [--history 40]
+                              [--requests 500] [--concurrency 20] [--scenario NAME ...] [--compare old.json]
+
+Seeds ``--users`` synthetic users into a throwaway Postgres, each with
+``--history`` past sessions typed from the real word list, so summaries,
+n-gram tables and daily rollups are the size a regular's would be. Then each
+scenario in ``SCENARIOS`` is driven through the ASGI app in process by
+``--concurrency`` clients until ``--requests`` have completed, after
+``--warmup`` untimed ones. The synthetic users are deleted afterwards.
+
+Reported per scenario: throughput, p50/p95/p99 latency, status codes, and the
+SQL statements each request executed (counted on the engine, so only the ones
+made on the request's behalf).
+
+With ``--redis-url`` (or ``REDIS_URL``) the difficulty cache is on and
+``create_session`` only measures the enqueue; run the worker against the same
+database and Redis and the time it takes to drain the stream is reported too.
+
+Results are written as JSON (``benchmarks/results/load-<commit>.json`` by
+default). ``--compare`` prints the change in every metric against an earlier
+file and exits non-zero if any got worse by more than ``--threshold``.
+"""
+# pylint: disable=import-outside-toplevel
+# the api package reads its settings on import, so it's only imported once --database-url/--redis-url are applied
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+import numpy as np
+
+from benchmarks.startup import RESULTS_DIR, git_commit
+
+PASSWORD = "load-test-password"
+PASSAGE_WORDS = 50
+
+SUMMARY_QUERY = """
+    query {
+      userStatsSummary {
+        fastestWpm fastestNetWpm averageWpm averageNetWpm averageAccuracy averageRawAccuracy
+        totalSessions totalPracticeDuration practiceStreak longestStreak
+        unigraphs { id key count accuracy mistyped { key count } }
+        digraphs { key count accuracy meanInterval }
+      }
+    }
+"""
+
+CREATE_SESSION_MUTATION = """
+    mutation CreateUserStatsSession($userStatsSessionInput: UserStatsSessionInput!) {
+      createUserStatsSession(userStatsSessionInput: $userStatsSessionInput) { id wpm netWpm accuracy practiceDuration }
+    }
+"""
+
+# statements executed on behalf of the request being timed in this task
+statement_count: ContextVar[list[int] | None] = ContextVar("statement_count", default=None)
+
+
+# --------------------
+# Synthetic users
+# --------------------
+
+class Typist:
+    """A synthetic user's typing: a speed, and an error rate and rhythm per key."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.wpm = min(max(rng.gauss(55, 15), 20), 140)
+        # most keys are rarely missed, a few are a real weakness
+        self.error_rates: dict[str, float] = {}
+        self.intervals: dict[str, float] = {}
+
+    def error_rate(self, key: str) -> float:
+        if key not in self.error_rates:
+            self.error_rates[key] = min(self.rng.betavariate(1.2, 40), 0.3)
+        return self.error_rates[key]
+
+    def interval(self, pair: str) -> float:
+        if pair not in self.intervals:
+            # milliseconds between the two keys at this typist's speed, some pairs slower than others
+            self.intervals[pair] = 60_000 / (self.wpm * 5) * self.rng.lognormvariate(0, 0.3)
+        return self.intervals[pair]
+
+    def session(self, words: list[str], start_time: datetime) -> dict:
+        """One practice session over a random passage, as ``UserStatsSessionCreate`` fields."""
+        rng = self.rng
+        passage = rng.sample(words, PASSAGE_WORDS)
+
+        unigraphs: dict[str, dict] = {}
+        digraphs: dict[str, dict] = {}
+        errors = 0
+        for word in passage:
+            for key in word:
+                stat = unigraphs.setdefault(key, {"count": 0, "errors": 0, "mistyped": Counter()})
+                stat["count"] += 1
+                if rng.random() < self.error_rate(key):
+                    stat["errors"] += 1
+                    stat["mistyped"][rng.choice("abcdefghijklmnopqrstuvwxyz")] += 1
+                    errors += 1
+
+            for pair in zip(word, word[1:]):
+                pair = "".join(pair)
+                stat = digraphs.setdefault(pair, {"count": 0, "errors": 0, "intervals": []})
+                stat["count"] += 1
+                stat["errors"] += rng.random() < self.error_rate(pair[1])
+                stat["intervals"].append(self.interval(pair) * rng.uniform(0.8, 1.2))
+
+        chars = sum(len(word) for word in passage) + len(passage) - 1
+        wpm = max(int(rng.gauss(self.wpm, 4)), 1)
+        accuracy = round(100 * (chars - errors) / chars, 2)
+        practice_duration = int(chars / (wpm * 5) * 60_000)
+        return {
+            "wpm": wpm,
+            "net_wpm": int(wpm * accuracy / 100),
+            "accuracy": accuracy,
+            "raw_accuracy": round(accuracy - rng.uniform(0, 2), 2),
+            "practice_duration": practice_duration,
+            "start_time": start_time,
+            "end_time": start_time + timedelta(milliseconds=practice_duration),
+            "corrected_char_count": errors,
+            "deleted_char_count": errors,
+            "total_char_count": chars,
+            "total_keystrokes": chars + 2 * errors,
+            "error_char_count": errors,
+            "unigraphs": {
+                key: {
+                    "count": stat["count"],
+                    "accuracy": round(100 * (stat["count"] - stat["errors"]) / stat["count"]),
+                    "mistyped": dict(stat["mistyped"]),
+                }
+                for key, stat in unigraphs.items()
+            },
+            "digraphs": {
+                pair: {
+                    "count": stat["count"],
+                    "accuracy": round(100 * (stat["count"] - stat["errors"]) / stat["count"]),
+                    "mean_interval": round(sum(stat["intervals"]) / stat["count"]),
+                }
+                for pair, stat in digraphs.items()
+            },
+        }
+
+
+def as_graphql_input(session: dict) -> dict:
+    """A ``Typist.session`` as ``UserStatsSessionInput`` variables, the way the client sends it."""
+    return {
+        "wpm": session["wpm"],
+        "netWpm": session["net_wpm"],
+        "accuracy": session["accuracy"],
+        "rawAccuracy": session["raw_accuracy"],
+        "practiceDuration": session["practice_duration"],
+        "startTime": session["start_time"].timestamp(),
+        "endTime": session["end_time"].timestamp(),
+        "correctedCharCount": session["corrected_char_count"],
+        "deletedCharCount": session["deleted_char_count"],
+        "correctCharsTyped": session["total_char_count"],
+        "totalCharsTyped": session["total_keystrokes"],
+        "errorCharCount": session["error_char_count"],
+        "unigraphs": [
+            {
+                "key": key,
+                "count": stat["count"],
+                "accuracy": stat["accuracy"],
+                "mistyped": [{"key": mistyped, "count": count} for mistyped, count in stat["mistyped"].items()],
+            }
+            for key, stat in session["unigraphs"].items()
+        ],
+        "digraphs": [
+            {"key": pair, "count": stat["count"], "accuracy": stat["accuracy"], "meanInterval": stat["mean_interval"]}
+            for pair, stat in session["digraphs"].items()
+        ],
+    }
+
+
+class LoadUser:
+    def __init__(self, user_id, email: str, token: str, typist: Typist):
+        self.id = user_id
+        self.email = email
+        self.token = token
+        self.typist = typist
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+async def seed_users(count: int, history: int, rng: random.Random, words: list[str]) -> list[LoadUser]:
+    """``count`` users, each with ``history`` sessions over the past ``history`` days folded into their stats."""
+    from sqlalchemy import insert
+
+    from api.auth.jwt import create_access_token
+    from api.auth.security import get_password_hash
+    from api.controllers.user_stats_session_controller import apply_sessions_to_summaries
+    from api.factories.database import async_sessionmaker_instance
+    from api.models.user_model import User
+    from api.models.user_stats_session_model import UserStatsSession
+    from api.schemas.user_stats_session_schema import UserStatsSessionCreate
+
+    run_id = uuid4().hex[:8]
+    # one hash for everyone; login still verifies it in full each time
+    hashed_password = get_password_hash(PASSWORD)
+    emails = [f"load-{run_id}-{index}@example.com" for index in range(count)]
+
+    async with async_sessionmaker_instance() as db:
+        user_ids = (await db.scalars(
+            insert(User)
+            .values([
+                {"email": email, "user_name": f"load{index}", "hashed_password": hashed_password}
+                for index, email in enumerate(emails)
+            ])
+            .returning(User.id)
+        )).all()
+        users = [
+            LoadUser(user_id, email, create_access_token({"sub": str(user_id)}), Typist(random.Random(rng.random())))
+            for user_id, email in zip(user_ids, emails)
+        ]
+
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        sessions = [
+            (user.id, UserStatsSessionCreate(**user.typist.session(
+                words, today - timedelta(days=history - day, hours=-rng.uniform(7, 23))
+            )))
+            for user in users
+            for day in range(history)
+        ]
+        if sessions:
+            await db.execute(insert(UserStatsSession).values([
+                {"user_id": user_id, "aggregated": True, **data.model_dump(exclude={"unigraphs", "digraphs"})}
+                for user_id, data in sessions
+            ]))
+            await apply_sessions_to_summaries(sessions, db)
+        await db.commit()
+
+    return users
+
+
+async def drop_users(users: list[LoadUser]) -> None:
+    from sqlalchemy import delete, select
+
+    from api.factories.database import async_sessionmaker_instance
+    from api.models.digraph_model import Digraph
+    from api.models.unigraph_model import Unigraph
+    from api.models.user_daily_stats_model import UserDailyStats
+    from api.models.user_model import User
+    from api.models.user_stats_session_model import UserStatsSession
+    from api.models.user_stats_summary_model import UserStatsSummary
+
+    user_ids = [user.id for user in users]
+    summary_ids = select(UserStatsSummary.id).where(UserStatsSummary.user_id.in_(user_ids))
+    async with async_sessionmaker_instance() as db:
+        await db.execute(delete(Unigraph).where(Unigraph.user_stats_summary_id.in_(summary_ids)))
+        await db.execute(delete(Digraph).where(Digraph.user_stats_summary_id.in_(summary_ids)))
+        for model in (UserStatsSummary, UserDailyStats, UserStatsSession):
+            await db.execute(delete(model).where(model.user_id.in_(user_ids)))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+
+# --------------------
+# Scenarios
+# --------------------
+
+# each builds (method, path, json body, headers) for one request by a random user
+def practice_text(user: LoadUser, _words: list[str]) -> tuple:
+    return "POST", "/text/generate-practice-text", {}, user.headers
+
+
+def create_session(user: LoadUser, words: list[str]) -> tuple:
+    session = user.typist.session(words, datetime.now(timezone.utc))
+    body = {"query": CREATE_SESSION_MUTATION, "variables": {"userStatsSessionInput": as_graphql_input(session)}}
+    return "POST", "/graphql", body, user.headers
+
+
+def stats_summary(user: LoadUser, _words: list[str]) -> tuple:
+    return "POST", "/graphql", {"query": SUMMARY_QUERY}, user.headers
+
+
+def login(user: LoadUser, _words: list[str]) -> tuple:
+    return "POST", "/auth/login", {"email": user.email, "password": PASSWORD}, {}
+
+
+SCENARIOS = {
+    "practice_text": practice_text,
+    "create_session": create_session,
+    "stats_summary": stats_summary,
+    "login": login,
+}
+
+
+# --------------------
+# Running
+# --------------------
+
+def count_statements(_conn, _cursor, _statement, *_args) -> None:
+    counter = statement_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+async def send(client, request: tuple) -> tuple[int, float, int]:
+    """Status (0 for a GraphQL error), milliseconds and statement count of one request."""
+    method, path, body, headers = request
+    counter = [0]
+    token = statement_count.set(counter)
+    try:
+        started = perf_counter()
+        response = await client.request(method, path, json=body, headers=headers)
+        elapsed_ms = (perf_counter() - started) * 1000
+    finally:
+        statement_count.reset(token)
+
+    status = response.status_code
+    if path == "/graphql" and status == 200 and response.json().get("errors"):
+        status = 0
+    return status, elapsed_ms, counter[0]
+
+
+async def run_scenario(client, scenario, users: list[LoadUser], words: list[str], args, rng: random.Random) -> dict:
+    # built up front so generating sessions isn't timed
+    requests = [scenario(rng.choice(users), words) for _ in range(args.warmup + args.requests)]
+    warmup, timed = requests[:args.warmup], iter(requests[args.warmup:])
+    samples: list[tuple[int, float, int]] = []
+
+    for request in warmup:
+        await send(client, request)
+
+    async def worker():
+        for request in timed:
+            samples.append(await send(client, request))
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duration = perf_counter() - started
+
+    statuses = Counter(status for status, _, _ in samples)
+    latencies = np.array([elapsed_ms for _, elapsed_ms, _ in samples])
+    statements = np.array([count for _, _, count in samples])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": sum(count for status, count in statuses.items() if not 200 <= status < 300),
+        # 0 is a GraphQL response carrying errors
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "duration_s": duration,
+        "throughput_rps": len(samples) / duration,
+        "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "mean": latencies.mean(), "max": latencies.max()},
+        "statements": {"mean": statements.mean(), "max": int(statements.max())},
+    }
+
+
+async def wait_for_drain(timeout: float) -> float | None:
+    """Seconds until every consumer group on the session stream has caught up; None if none did in time."""
+    from api.factories.redis import get_redis
+    from api.settings import settings
+
+    redis = get_redis()
+    started = perf_counter()
+    while perf_counter() - started < timeout:
+        groups = await redis.xinfo_groups(settings.SESSION_STREAM)
+        if groups and all(not group["pending"] and not group.get("lag") for group in groups):
+            return perf_counter() - started
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy import event
+
+    from api.factories.database import Base, db_engine
+    from api.main import app
+    from api.services.corpus_service import read_word_list
+    from api.services.session_queue import session_queue_enabled
+
+    # the client logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    words = [word for word in read_word_list() if word.isalpha() and word.islower()]
+    queued = session_queue_enabled()
+
+    async with db_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    started = perf_counter()
+    users = await seed_users(args.users, args.history, rng, words)
+    print(f"Seeded {len(users)} users with {args.history} sessions each in {perf_counter() - started:.1f}s")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "users": args.users,
+            "history": args.history,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "session_queue": queued,
+        },
+        "scenarios": {},
+    }
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count_statements)
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://load") as client:
+            for name in args.scenario or SCENARIOS:
+                results["scenarios"][name] = result = await run_scenario(
+                    client, SCENARIOS[name], users, words, args, rng
+                )
+                if name == "create_session" and queued:
+                    result["drain_s"] = await wait_for_drain(args.drain_timeout)
+                print(
+                    f"{name:<16} {result['throughput_rps']:>8.1f} req/s"
+                    f"  p50 {result['latency_ms']['p50']:>7.1f} ms  p95 {result['latency_ms']['p95']:>7.1f} ms"
+                    f"  p99 {result['latency_ms']['p99']:>7.1f} ms  {result['statements']['mean']:>5.1f} statements"
+                    f"  {result['errors']} errors"
+                )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", count_statements)
+        # sessions still queued for them are skipped by the worker once their rows are gone
+        await drop_users(users)
+        await db_engine.dispose()
+
+    return results
+
+
+# --------------------
+# Reporting
+# --------------------
+
+def metrics(results: dict) -> dict[str, tuple[float, bool]]:
+    """Comparable metrics by dotted name, with whether higher is better."""
+    flat = {}
+    for name, scenario in results["scenarios"].items():
+        flat[f"{name}.throughput_rps"] = (scenario["throughput_rps"], True)
+        for percentile in ("p50", "p95", "p99"):
+            flat[f"{name}.latency_ms.{percentile}"] = (scenario["latency_ms"][percentile], False)
+        flat[f"{name}.statements.mean"] = (scenario["statements"]["mean"], False)
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Print each metric's change against ``baseline``; True if none got worse by more than ``threshold``."""
+    ok = True
+    old, new = metrics(baseline), metrics(current)
+    print(f"{'metric':<40} {baseline.get('commit', '?'):>10} {current.get('commit', '?'):>10} {'change':>8}")
+    for metric in sorted(old.keys() & new.keys()):
+        (before, higher_is_better), (after, _) = old[metric], new[metric]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if (-change if higher_is_better else change) > threshold:
+            flag, ok = "  REGRESSED", False
+        print(f"{metric:<40} {before:>10.1f} {after:>10.1f} {change:>+8.0%}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="a disposable Postgres; defaults to DATABASE_URL")
+    parser.add_argument("--redis-url", help="enables the difficulty cache and session queue; defaults to REDIS_URL")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--history", type=int, default=40, help="past sessions per synthetic user")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="run only these; repeatable")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drain-timeout", type=float, default=60, help="seconds to wait for the worker")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="an earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression before failing, as a fraction")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    if args.users < 1 or args.requests < 1 or args.concurrency < 1:
+        parser.error("--users, --requests and --concurrency must be at least 1")
+
+    results = asyncio.run(run(args))
+
+    output = args.output or RESULTS_DIR / f"load-{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+
+    if args.compare and not compare(json.loads(args.compare.read_text()), results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
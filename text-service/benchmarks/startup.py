@@ -0,0 +1,263 @@
+"""Startup benchmarks for the API package.
+
+    python -m benchmarks.startup [--runs 5] [--database-url URL] [--startup-optimized] [--compare old.json]
+
+Every measurement runs in a fresh interpreter so it sees a cold start:
+
+- ``import``: ``python -X importtime -c "import api.main"``, the total and the
+  modules that dominate it
+- ``create_app``: building the FastAPI app once its modules are imported
+- ``requests``: the first and a warm call to each endpoint in ``REQUESTS``, in
+  process through the ASGI app. Needs ``--database-url`` pointing at a
+  throwaway Postgres, which gets the schema and a benchmark user.
+
+Results are written as JSON (``benchmarks/results/startup-<commit>.json`` by
+default). ``--compare`` prints the change in every median against an earlier
+file and exits non-zero if any regressed by more than ``--threshold``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+TOP_MODULES = 25
+
+# (name, method, path, body); GraphQL and the text endpoint are authenticated as the benchmark user
+REQUESTS = [
+    ("health", "GET", "/health", None),
+    ("me", "GET", "/auth/me", None),
+    ("graphql_user", "POST", "/graphql", {"query": "query { user { id userName } }"}),
+    ("practice_text", "POST", "/text/generate-practice-text", {}),
+]
+
+
+# --------------------
+# Children
+# --------------------
+
+def child_create_app() -> dict:
+    from time import perf_counter  # pylint: disable=import-outside-toplevel
+    from api.factories.fastapi_app import create_app  # pylint: disable=import-outside-toplevel
+
+    started = perf_counter()
+    create_app()
+    return {"create_app_ms": (perf_counter() - started) * 1000}
+
+
+def child_requests() -> dict:
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+    from time import perf_counter
+    from uuid import uuid4
+
+    started = perf_counter()
+    from api.main import app
+    imported_ms = (perf_counter() - started) * 1000
+
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy import delete
+
+    from api.auth.jwt import create_access_token
+    from api.factories.database import Base, db_engine, async_sessionmaker_instance
+    from api.models.user_model import User
+
+    async def run() -> dict:
+        async with db_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        user = User(email=f"bench-{uuid4()}@example.com", user_name="bench", hashed_password="-")
+        async with async_sessionmaker_instance() as db:
+            db.add(user)
+            await db.commit()
+
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+        timings = {}
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+                for name, method, path, body in REQUESTS:
+                    for phase in ("first", "warm"):
+                        request_started = perf_counter()
+                        response = await client.request(method, path, json=body, headers=headers)
+                        response.raise_for_status()
+                        timings.setdefault(name, {})[phase] = (perf_counter() - request_started) * 1000
+        finally:
+            async with async_sessionmaker_instance() as db:
+                await db.execute(delete(User).where(User.id == user.id))
+                await db.commit()
+            await db_engine.dispose()
+        return timings
+
+    return {"import_app_ms": imported_ms, "requests": asyncio.run(run())}
+
+
+CHILDREN = {"create_app": child_create_app, "requests": child_requests}
+
+
+# --------------------
+# Measurement
+# --------------------
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """The ``-X importtime`` lines as ``{"module", "self_ms", "cumulative_ms"}`` dicts."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def run_python(args: list[str], env: dict) -> subprocess.CompletedProcess:
+    result = subprocess.run([sys.executable, *args], cwd=SERVICE_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    return result
+
+
+def run_child(name: str, env: dict) -> dict:
+    result = run_python(["-m", "benchmarks.startup", "--child", name], env)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarise(samples: list[float]) -> dict:
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+def measure_imports(runs: int, env: dict) -> dict:
+    totals, self_times, cumulative_times = [], {}, {}
+    for _ in range(runs):
+        modules = parse_importtime(run_python(["-X", "importtime", "-c", "import api.main"], env).stderr)
+        for module in modules:
+            self_times.setdefault(module["module"], []).append(module["self_ms"])
+            cumulative_times.setdefault(module["module"], []).append(module["cumulative_ms"])
+        totals.append(next(module["cumulative_ms"] for module in modules if module["module"] == "api.main"))
+
+    def top(times: dict[str, list[float]]) -> list[dict]:
+        medians = {module: statistics.median(samples) for module, samples in times.items()}
+        return [
+            {"module": module, "ms": round(ms, 2)}
+            for module, ms in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:TOP_MODULES]
+        ]
+
+    return {
+        "total_ms": summarise(totals),
+        "top_cumulative": top(cumulative_times),
+        "top_self": top(self_times),
+    }
+
+
+def measure(args: argparse.Namespace) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(SERVICE_ROOT)}
+    env["STARTUP_OPTIMIZED"] = "true" if args.startup_optimized else "false"
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "startup_optimized": args.startup_optimized,
+        "runs": args.runs,
+        "import": measure_imports(args.runs, env),
+        "create_app_ms": summarise([run_child("create_app", env)["create_app_ms"] for _ in range(args.runs)]),
+    }
+
+    if args.database_url:
+        samples = [run_child("requests", env) for _ in range(args.runs)]
+        results["import_app_ms"] = summarise([sample["import_app_ms"] for sample in samples])
+        results["requests_ms"] = {
+            name: {
+                phase: summarise([sample["requests"][name][phase] for sample in samples])
+                for phase in ("first", "warm")
+            }
+            for name, *_ in REQUESTS
+        }
+    return results
+
+
+# --------------------
+# Reporting
+# --------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def medians(results: dict, prefix: str = "") -> dict[str, float]:
+    """Every ``median`` in the results, flattened to dotted metric names."""
+    flat = {}
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        if "median" in value:
+            flat[f"{prefix}{key}"] = value["median"]
+        else:
+            flat.update(medians(value, f"{prefix}{key}."))
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Print each metric's change against ``baseline``; True if none slowed down by more than ``threshold``."""
+    ok = True
+    old, new = medians(baseline), medians(current)
+    print(f"{'metric':<40} {baseline.get('commit', '?'):>10} {current.get('commit', '?'):>10} {'change':>8}")
+    for metric in sorted(old.keys() & new.keys()):
+        change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+        flag = ""
+        if change > threshold:
+            flag, ok = "  REGRESSED", False
+        print(f"{metric:<40} {old[metric]:>10.1f} {new[metric]:>10.1f} {change:>+8.0%}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="a disposable Postgres for the request timings")
+    parser.add_argument("--startup-optimized", action="store_true", help="measure the Lambda startup mode")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="an earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing, as a fraction")
+    parser.add_argument("--child", choices=CHILDREN, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(CHILDREN[args.child]()))
+        return
+
+    results = measure(args)
+
+    output = args.output or RESULTS_DIR / f"startup-{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+
+    if args.compare and not compare(json.loads(args.compare.read_text()), results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
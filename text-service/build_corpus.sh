@@ -0,0 +1,4 @@
+#!/usr/bin/bash
+source .venv/bin/activate
+python -m api.services.corpus_service
+deactivate
@@ -1,6 +1,7 @@
 #!/usr/bin/bash
 
 source .venv/bin/activate
-python worker/main.py
+# the worker reuses the api package for its models and aggregation
+PYTHONPATH=. python worker/main.py
 deactivate
 
@@ -5,10 +5,24 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     PYTHONPATH: str = "./"
-    # redis settings
-    QUEUE_NAME: str = "task_queue"
-    REDIS_HOST: str = "localhost"
-    REDIS_PORT: int = 6379
+
+    # session aggregation; the stream name comes from the api settings
+    CONSUMER_GROUP: str = "session-aggregators"
+    # must be unique per worker host; consumers are named <CONSUMER_NAME>[-p<process>]-<task>
+    CONSUMER_NAME: str = "worker-1"
+    BATCH_SIZE: int = 100
+    BLOCK_MS: int = 5000
+    RETRY_DELAY: float = 5.0
+    # consumer tasks per process, and processes per worker
+    CONCURRENCY: int = 4
+    PROCESSES: int = 1
+    # pending entries idle this long are taken over from the consumer that read them
+    CLAIM_IDLE_MS: int = 60_000
+    # a session that has failed on this many deliveries is moved to DEAD_LETTER_STREAM instead of retried again
+    MAX_DELIVERIES: int = 5
+    DEAD_LETTER_STREAM: str = "user-stats-sessions-dead"
+    # seconds between session partition maintenance runs; concurrent runs across processes skip
+    PARTITION_INTERVAL: float = 3600.0
 
     # uvicorn settings
     DEBUG: bool = True
@@ -18,7 +32,9 @@ class Settings(BaseSettings):
     # Dynamically determine the environment file
     model_config = SettingsConfigDict(
         env_file=f".env.{os.getenv('ENV', 'dev')}",
-        case_sensitive=True
+        case_sensitive=True,
+        # the env file is shared with the api settings
+        extra="ignore",
     )
 
 settings: Settings = Settings()
@@ -1,39 +1,194 @@
-import time
+import asyncio
+import multiprocessing
+import signal
 
-from rq.queue import Queue
+from pydantic import ValidationError
+from redis.exceptions import ResponseError
 
-from app.factories.redis import create_redis_client
 from app.settings import settings
+from api.controllers.user_stats_session_controller import apply_sessions_to_summaries, claim_sessions
+from api.factories.database import async_sessionmaker_instance
+from api.factories.redis import get_redis
+from api.services.difficulty_cache import difficulty_cache
+from api.services.session_partitions import maintain_session_partitions
+from api.services.session_queue import decode_session
+from api.settings import settings as api_settings
 
 
-redis_client = create_redis_client()
-redis_queue = Queue(connection=redis_client)
+STREAM = api_settings.SESSION_STREAM
 
 
-def process_task(task):
-    """This function processes a single task"""
-    # For simplicity, we'll just print the task; this could be more complex
-    print(f"Processing task: {task}")
-    redis_queue.enqueue(task)
+async def create_consumer_group(redis_client):
+    """Create the consumer group (and the stream) on first run"""
+    try:
+        await redis_client.xgroup_create(STREAM, settings.CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
 
-def worker():
-    """Worker function to continually pull tasks from the Redis queue"""
-    while True:
+
+async def process_batch(sessions):
+    """Aggregate decoded ``(entry_id, fields, user_id, session_id, session)`` entries in a single transaction
+
+    Sessions already aggregated, by an earlier delivery of the same entry, are skipped.
+    """
+    # a stable order keeps each user's sessions in sequence and locks summaries in the same order across consumers
+    sessions = sorted(sessions, key=lambda session: str(session[2]))
+
+    async with async_sessionmaker_instance() as db:
+        claimed = await claim_sessions(
+            [(session_id, data.start_time) for _, _, _, session_id, data in sessions if session_id is not None], db
+        )
+        user_ids = await apply_sessions_to_summaries(
+            [
+                (user_id, data)
+                for _, _, user_id, session_id, data in sessions
+                # entries queued before they carried an id can't be checked, so they're applied as before
+                if session_id is None or session_id in claimed
+            ],
+            db,
+        )
+        await db.commit()
+
+    for user_id in user_ids:
+        await difficulty_cache.invalidate(user_id)
+
+
+async def dead_letter(redis_client, entry_id, fields, error: str):
+    """Move an entry that can't be applied to DEAD_LETTER_STREAM, with the error, and acknowledge it"""
+    print(f"Dead-lettering session {entry_id}: {error}")
+    await redis_client.xadd(settings.DEAD_LETTER_STREAM, {**fields, b"entry_id": entry_id, b"error": error})
+    await redis_client.xack(STREAM, settings.CONSUMER_GROUP, entry_id)
+
+
+async def deliveries(redis_client, entry_id) -> int:
+    pending = await redis_client.xpending_range(STREAM, settings.CONSUMER_GROUP, min=entry_id, max=entry_id, count=1)
+    return pending[0]["times_delivered"] if pending else 1
+
+
+async def handle(redis_client, entries):
+    sessions = []
+    for entry_id, fields in entries:
         try:
-            # Pull a task from the Redis queue
-            task = redis_client.lpop(settings.QUEUE_NAME)  # lpop pops the first item from the list
+            sessions.append((entry_id, fields, *decode_session(fields)))
+        except (KeyError, ValueError, ValidationError) as e:
+            # will never decode, so there's no point retrying it
+            await dead_letter(redis_client, entry_id, fields, f"malformed: {e}")
+
+    if not sessions:
+        return
+
+    try:
+        await process_batch(sessions)
+    except Exception as e:
+        # one session that can't be applied fails the whole transaction; apply the rest one at a time
+        print(f"Batch of {len(sessions)} sessions failed, retrying individually: {e}")
+        for session in sessions:
+            await handle_one(redis_client, session)
+        return
+
+    # only acknowledged once committed; anything else stays pending and is reclaimed after CLAIM_IDLE_MS
+    await redis_client.xack(STREAM, settings.CONSUMER_GROUP, *(entry_id for entry_id, *_ in sessions))
 
-            if task:
-                # If a task is available, process it
-                process_task(task.decode('utf-8'))  # Decoding bytes to string
-            else:
-                print("No tasks in the queue. Waiting for new tasks...")
-                time.sleep(5)  # Sleep for a bit before checking the queue again
 
+async def handle_one(redis_client, session):
+    entry_id, fields = session[:2]
+    try:
+        await process_batch([session])
+    except Exception as e:
+        if await deliveries(redis_client, entry_id) >= settings.MAX_DELIVERIES:
+            await dead_letter(redis_client, entry_id, fields, str(e))
+        else:
+            print(f"Session {entry_id} failed, leaving it pending to be reclaimed: {e}")
+        return
+
+    await redis_client.xack(STREAM, settings.CONSUMER_GROUP, entry_id)
+
+
+async def consume(redis_client, consumer_name: str, stopping: asyncio.Event):
+    """One consumer: reclaim stale pending sessions, otherwise block on new ones"""
+    while not stopping.is_set():
+        try:
+            # entries another consumer read but never acknowledged, e.g. because it crashed mid-batch
+            claimed = (await redis_client.xautoclaim(
+                STREAM,
+                settings.CONSUMER_GROUP,
+                consumer_name,
+                min_idle_time=settings.CLAIM_IDLE_MS,
+                count=settings.BATCH_SIZE,
+            ))[1]
+            if claimed:
+                await handle(redis_client, claimed)
+                continue
+
+            # blocks until sessions arrive, then returns up to BATCH_SIZE of them
+            response = await redis_client.xreadgroup(
+                settings.CONSUMER_GROUP,
+                consumer_name,
+                {STREAM: ">"},
+                count=settings.BATCH_SIZE,
+                block=settings.BLOCK_MS,
+            )
+            for _, entries in response:
+                await handle(redis_client, entries)
+
+        except Exception as e:
+            print(f"Error processing sessions in {consumer_name}: {e}")
+            await asyncio.sleep(settings.RETRY_DELAY)
+
+
+async def maintain_partitions(stopping: asyncio.Event):
+    """Keep the coming months' session partitions created, and archive expired ones, every PARTITION_INTERVAL"""
+    while not stopping.is_set():
+        try:
+            async with async_sessionmaker_instance() as db:
+                await maintain_session_partitions(db)
+                await db.commit()
         except Exception as e:
-            print(f"Error processing task: {e}")
-            time.sleep(5)  # Sleep before retrying in case of error
+            print(f"Error maintaining session partitions: {e}")
+
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=settings.PARTITION_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def worker(name: str):
+    """Run CONCURRENCY consumers in this process until SIGINT/SIGTERM"""
+    # the same client the api publishes sessions with, so both sides read REDIS_URL
+    redis_client = get_redis()
+    if redis_client is None:
+        raise RuntimeError("REDIS_URL must be set for the worker")
+    await create_consumer_group(redis_client)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    # consumers finish their current batch and exit within BLOCK_MS of a stop signal
+    await asyncio.gather(
+        maintain_partitions(stopping),
+        *(consume(redis_client, f"{name}-{index}", stopping) for index in range(settings.CONCURRENCY)),
+    )
+    await redis_client.aclose()
+
+
+def run_worker(name: str):
+    asyncio.run(worker(name))
+
 
 if __name__ == '__main__':
-    print("Worker started...")
-    worker()
+    print(f"Worker started with {settings.PROCESSES} process(es) x {settings.CONCURRENCY} consumer(s)...")
+
+    if settings.PROCESSES == 1:
+        run_worker(settings.CONSUMER_NAME)
+    else:
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(f"{settings.CONSUMER_NAME}-p{index}",))
+            for index in range(settings.PROCESSES)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()